@@ -0,0 +1,111 @@
+"""Data-parallel training scaling check: the same fine-tuning run under torchrun with 1, 2, 4, ... processes.
+
+Usage: python benchmarks/ddp_scaling.py [--processes 1,2,4] [--scale 50] [--epochs 1]
+           [--global-batch-size 16] [--output ddp_scaling.json]
+
+The model is the fixture tiny GPT-2 and the data is the fixture training set
+repeated --scale times (see run_benchmarks.py), so nothing touches the
+network. Every run keeps the same global batch through gradient accumulation,
+so it takes the same optimizer steps; only the wall time should change. Each
+run's throughput is compared with the single-process run: speedup is the ratio
+of samples/sec, efficiency the speedup divided by the process count. Linear
+scaling needs at least as many free cores as processes.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from run_benchmarks import BenchmarkContext, scale_collected_data, quiet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def prepare_inputs(work_dir, scale):
+    """The fixture model and a dataset of `scale` copies of the fixture training set"""
+    from zombies_dataset import write_dataset
+
+    ctx = BenchmarkContext(work_dir, 1, scale)
+    try:
+        collected_data = scale_collected_data(ctx.collected_data(), scale)
+        training_data = ctx.create_training_data(collected_data)
+        with quiet():
+            dataset_dir = write_dataset(collected_data, training_data, root=os.path.join(work_dir, 'datasets'))
+        return ctx.model_dir(), dataset_dir, len(training_data)
+    finally:
+        ctx.close()
+
+
+def run_training(processes, model_dir, dataset_dir, work_dir, args):
+    """One torchrun launch of train_zombies_model.py; returns its scaling report"""
+    run_dir = os.path.join(work_dir, f'run-{processes}')
+    os.makedirs(run_dir, exist_ok=True)
+    report = os.path.join(run_dir, 'scaling.json')
+    command = [sys.executable, '-m', 'torch.distributed.run', '--standalone', f'--nproc_per_node={processes}',
+               os.path.join(ROOT, 'train_zombies_model.py'),
+               '--data', dataset_dir, '--base-model', model_dir, '--block-size', str(args.block_size),
+               '--output-dir', os.path.join(run_dir, 'model'), '--no-quantize', '--no-draft',
+               '--epochs', str(args.epochs), '--global-batch-size', str(args.global_batch_size),
+               '--scaling-report', report]
+    # Checkpoints and logs go to the run directory rather than the repository
+    log_path = os.path.join(run_dir, 'train.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run(command, cwd=run_dir, stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        with open(log_path, encoding='utf-8') as log:
+            print(log.read()[-4000:])
+        raise RuntimeError(f"Training with {processes} processes failed")
+    with open(report, encoding='utf-8') as f:
+        return json.load(f)[0]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure data-parallel training scaling")
+    parser.add_argument('--processes', default='1,2,4',
+                        help="Comma-separated process counts; the first is the baseline")
+    parser.add_argument('--scale', type=int, default=50,
+                        help="Copies of the fixture training set")
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--block-size', type=int, default=128)
+    parser.add_argument('--global-batch-size', type=int, default=16,
+                        help="Must be a multiple of every process count")
+    parser.add_argument('--output', default='ddp_scaling.json')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    process_counts = [int(count) for count in args.processes.split(',')]
+    work_dir = tempfile.mkdtemp(prefix='zombies-ddp-')
+    try:
+        model_dir, dataset_dir, examples = prepare_inputs(work_dir, args.scale)
+        print(f"{examples} training examples, global batch {args.global_batch_size}, {os.cpu_count()} CPUs")
+        runs = []
+        for processes in process_counts:
+            print(f"Training with {processes} processes...", flush=True)
+            runs.append(run_training(processes, model_dir, dataset_dir, work_dir, args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = runs[0]
+    print(f"\n{'processes':>9} {'threads':>7} {'accum':>5} {'steps':>5} {'seconds':>8} "
+          f"{'blocks/s':>9} {'tokens/s':>9} {'speedup':>7} {'efficiency':>10}")
+    for run in runs:
+        speedup = run["samples_per_second"] / baseline["samples_per_second"] if baseline["samples_per_second"] else 0.0
+        run["speedup"] = round(speedup, 2)
+        run["efficiency"] = round(speedup * baseline["world_size"] / run["world_size"], 2)
+        print(f"{run['world_size']:>9} {run['threads_per_rank']:>7} {run['gradient_accumulation_steps']:>5} "
+              f"{run['steps']:>5} {run['train_seconds']:>8.2f} {run['samples_per_second']:>9.2f} "
+              f"{run['tokens_per_second']:>9.1f} {run['speedup']:>7.2f} {run['efficiency']:>10.0%}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"cpus": os.cpu_count(), "examples": examples, "runs": runs}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
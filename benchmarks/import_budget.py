@@ -0,0 +1,68 @@
+"""Check that the collector and chat CLI import within a startup time budget.
+
+Usage: python benchmarks/import_budget.py [--budget 0.5] [--runs 5]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['zombies_data_collector', 'zombies_chat']
+IMPORTTIME_LINE = re.compile(r'import time:\s+\d+\s+\|\s+(\d+)\s+\| ( *)(\S+)$')
+
+
+def time_import(module, runs):
+    """Best-of-`runs` wall time for importing `module` in a fresh interpreter, minus interpreter startup"""
+    def best(code):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    return max(best(f'import {module}') - best('pass'), 0.0)
+
+
+def slowest_imports(module, top=5):
+    """Packages imported directly by `module`, slowest first, as (seconds, name)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    # -X importtime lists children before their parent, indented two spaces per level
+    children = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(1)), len(match.group(2)), match.group(3)
+        if indent == 0:
+            if name == module:
+                return sorted(children, reverse=True)[:top]
+            children = []
+        elif indent == 2:
+            children.append((cumulative / 1e6, name))
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help="Maximum seconds allowed to import each module")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        elapsed = time_import(module, args.runs)
+        status = "ok" if elapsed <= args.budget else "OVER BUDGET"
+        failed = failed or elapsed > args.budget
+        print(f"{module}: {elapsed * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms) {status}")
+        for seconds, package in slowest_imports(module):
+            print(f"    {package:<30} {seconds * 1000:.0f} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
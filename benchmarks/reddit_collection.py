@@ -0,0 +1,126 @@
+"""Measure Reddit collection throughput against a local stand-in for Reddit's JSON API.
+
+Usage: python benchmarks/reddit_collection.py [--posts-per-query 500] [--latency-ms 50] [--workers 8]
+
+The stand-in serves paginated search results and comment trees with the same
+shape as reddit.com, adding `--latency-ms` to every response. Different search
+terms return overlapping posts, so deduplication is exercised too. Run with
+`--workers 1 --max-pages 1 --no-comments` for what a serial first-page-only
+crawl collects in the same setup.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zombies_fetcher import ZombiesFetcher
+from zombies_reddit import RedditClient
+
+SUBREDDITS = ["CODZombies", "blackops2"]
+SEARCH_TERMS = ["Black Ops 2", "BO2 zombies", "Black Ops II zombies"]
+COMMENTS_PER_POST = 6
+
+
+def make_handler(posts_per_query, latency):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in one write; separate small writes stall on delayed ACKs
+        wbufsize = 1 << 16
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            if len(parts) == 3 and parts[2] == 'search.json':
+                self.send_json(self.search(parts[1], parse_qs(url.query)))
+            elif len(parts) >= 4 and parts[2] == 'comments':
+                self.send_json(self.thread(parts[1], parts[3]))
+            else:
+                self.send_error(404)
+
+        def search(self, subreddit, query):
+            limit = int(query.get('limit', ['25'])[0])
+            # Each term's results start at a different offset, so consecutive terms share half their posts
+            term_offset = SEARCH_TERMS.index(query['q'][0]) * posts_per_query // 2 \
+                if query['q'][0] in SEARCH_TERMS else 0
+            after = query.get('after', [None])[0]
+            start = int(after.split('_')[-1]) + 1 if after else term_offset
+            end = min(start + limit, term_offset + posts_per_query)
+            children = [{"kind": "t3", "data": {
+                "name": f"t3_{subreddit}_{i}", "title": f"Zombies map strategy {i} for {subreddit}",
+                "selftext": f"Round {i} on this zombie map needs a good weapon. Pack the wall weapon early.",
+                "permalink": f"/r/{subreddit}/comments/{i}/post_{i}/",
+                "num_comments": COMMENTS_PER_POST}} for i in range(start, end)]
+            return {"kind": "Listing", "data": {
+                "children": children,
+                "after": f"t3_{subreddit}_{end - 1}" if end < term_offset + posts_per_query else None}}
+
+        def thread(self, subreddit, post_id):
+            def comment(i, replies):
+                return {"kind": "t1", "data": {
+                    "name": f"t1_{subreddit}_{post_id}_{i}",
+                    "body": f"Comment {i}: the zombie round strategy with this weapon works on every map.",
+                    "replies": {"kind": "Listing", "data": {"children": replies}} if replies else ""}}
+            half = COMMENTS_PER_POST // 2
+            top = [comment(i, [comment(half + i, [])]) for i in range(half)]
+            top.append({"kind": "more", "data": {"count": 10, "children": []}})
+            return [{"kind": "Listing", "data": {"children": []}},
+                    {"kind": "Listing", "data": {"children": top}}]
+
+    return StandInHandler
+
+
+def serve(posts_per_query, latency, ports):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(posts_per_query, latency))
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reddit collection throughput against a local stand-in")
+    parser.add_argument('--posts-per-query', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--max-pages', type=int, default=10)
+    parser.add_argument('--no-comments', action='store_true')
+    args = parser.parse_args()
+
+    # The stand-in runs in its own process so it doesn't compete with the client for the GIL
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(args.posts_per_query, args.latency_ms / 1000, ports),
+                                     daemon=True)
+    server.start()
+    base_url = f'http://127.0.0.1:{ports.get()}'
+
+    fetcher = ZombiesFetcher(max_workers=args.workers, requests_per_second=1000)
+    client = RedditClient(fetcher, base_url, max_pages=args.max_pages, browser_pool_size=0)
+    start = time.perf_counter()
+    posts, comments = client.collect(SUBREDDITS, SEARCH_TERMS, with_comments=not args.no_comments)
+    elapsed = time.perf_counter() - start
+    fetcher.close()
+    server.terminate()
+
+    print(f"{len(posts)} posts, {len(comments)} comments in {elapsed:.2f}s "
+          f"({len(posts) / elapsed * 60:.0f} posts/min, {len(comments) / elapsed * 60:.0f} comments/min)")
+    print(client.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,622 @@
+"""Offline benchmark suite for parsing, extraction, cleaning, training data, tokenization and generation.
+
+Usage: python benchmarks/run_benchmarks.py [--only parse,extract] [--repeat 5] [--scale 50]
+           [--output benchmark_results.json] [--baseline benchmarks/baseline.json]
+           [--threshold 0.25] [--update-baseline]
+
+Everything comes from benchmarks/fixtures: wiki and IGN pages (listed in
+pages.json) are served from a temporary HTTP cache in cache-only mode, YouTube
+transcripts come from transcripts.json, and the chat model is a randomly
+initialised GPT-2 built from tiny_gpt2/config.json with a BPE tokenizer
+trained on the fixture text. Nothing touches the network. The committed pages
+are synthetic (pages.json says so until --record replaces them): hand-built
+from the sites' markup and padded with filler scripts, so parse timings track
+changes to the parser, not how fast real Fandom pages parse.
+
+Results are written as JSON. Every timed metric (`*_per_second`, `*_ms`) is
+compared with the baseline and the script exits with status 1 if one is worse
+by more than the threshold, a fraction of the baseline value. A missing
+baseline is an error too, unless --allow-missing-baseline is given.
+The baseline's "thresholds" can override it per benchmark ("generate") or per
+metric ("generate.p95_ms"). Timings depend on the machine, so create the
+baseline with --update-baseline on the machine that gates changes. The generate
+benchmark also checks which passage the knowledge base answers each of
+KB_EXPECTED_ANSWERS with; a wrong answer fails the run with status 1 too.
+
+`--record` fetches every page in pages.json from the live sites and overwrites
+its fixture, for when the sites' markup changes.
+"""
+import argparse
+import contextlib
+import copy
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+# The suite must never reach the Hugging Face Hub
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zombies_data_collector import RELEVANCE_KEYWORDS, ZombiesDataCollector, ensure_nltk_resource, parse_content
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures')
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+# Allowed slowdown before a metric counts as a regression, as a fraction of the baseline
+DEFAULT_THRESHOLD = 0.25
+# Shortest timed run; faster functions are called repeatedly within a run
+MIN_RUN_SECONDS = 0.2
+FIXTURE_SOURCE = "COD Fandom"
+BLOCK_SIZE = 128
+GENERATE_MAX_LENGTH = 48
+PROMPTS = [
+    "What is the best strategy for Origins?",
+    "How do I build the Ice Staff?",
+    "What perks should I buy first?",
+    "How do you survive high rounds on Buried?",
+    "Which wonder weapon is the strongest?",
+]
+# Answered straight from the knowledge base index
+KB_QUESTIONS = [
+    "What are the stats for Galil?",
+    "Where can I find the Paralyzer?",
+    "What easter eggs are in Die Rise?",
+    "How do I pack a punch the Ray Gun?",
+    "What is TranZit?",
+]
+# Questions and the (name, field) of the passage the index must answer them with, or None
+KB_EXPECTED_ANSWERS = [
+    ("Tell me about the Ray Gun", ("Ray Gun", "description")),
+    ("What is the Ray Gun?", ("Ray Gun", "description")),
+    ("How do I pack-a-punch the Ray Gun?", ("Ray Gun", "pack_a_punch")),
+    ("What are the stats for Galil?", ("Galil", "stats")),
+    ("Are there multiple ways to survive on Origins", ("Origins", "strategies")),
+    ("Are there multiple maps like Origins", None),
+    ("Is there a paper trail on Origins?", None),
+    ("What guns are on Origins?", ("Origins", "weapons")),
+]
+
+
+def load_manifest(fixtures_dir=FIXTURES_DIR):
+    with open(os.path.join(fixtures_dir, 'pages.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def manifest_pages(manifest):
+    """(url, fixture file) for every page in the manifest"""
+    pages = ([manifest['maps_page']] + manifest['maps'] + [manifest['weapons_category']] + manifest['weapons'] +
+             manifest['aliases'] + manifest['guides'])
+    return [(page['url'], page['file']) for page in pages]
+
+
+def read_page(filename, fixtures_dir=FIXTURES_DIR):
+    with open(os.path.join(fixtures_dir, 'pages', filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@contextlib.contextmanager
+def quiet():
+    """Hide the per-page progress lines the collector prints"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def best_of(repeat, function, min_seconds=MIN_RUN_SECONDS):
+    """Seconds per call in the fastest of `repeat` runs, and the last call's result.
+
+    Like timeit's autorange, each run makes as many calls as the first (warm-up)
+    run needed to last `min_seconds`, so quick functions are not timed at the
+    resolution of the clock.
+    """
+    number, start = 0, time.perf_counter()
+    while True:
+        result = function()
+        number += 1
+        if time.perf_counter() - start >= min_seconds:
+            break
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = function()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds else None
+
+
+def percentile_ms(latencies, q):
+    ordered = sorted(latencies)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+
+def scale_collected_data(collected_data, copies):
+    """Renamed copies of every record, for workloads bigger than the fixture set"""
+    scaled = {category: {} for category in collected_data}
+    for category, records in collected_data.items():
+        for name, record in records.items():
+            for i in range(copies):
+                scaled[category][f"{name} {i}" if i else name] = copy.deepcopy(record)
+    return scaled
+
+
+class BenchmarkContext:
+    """A collector replaying the fixtures from a cache in `work_dir`, plus the inputs
+    later benchmarks share, each built on first use"""
+
+    def __init__(self, work_dir, repeat, scale):
+        self.work_dir = work_dir
+        self.repeat = repeat
+        self.scale = scale
+        self.manifest = load_manifest()
+        with open(os.path.join(FIXTURES_DIR, 'transcripts.json'), 'r', encoding='utf-8') as f:
+            self.transcripts = json.load(f)
+
+        self.collector = ZombiesDataCollector(max_workers=4, requests_per_second=1000,
+                                              cache_mode='cache-only',
+                                              data_dir=os.path.join(work_dir, 'data'))
+        for url, filename in manifest_pages(self.manifest):
+            self.collector.fetcher.cache.store(url, url, read_page(filename))
+
+        self._collected_data = None
+        self._tokenizer = None
+        self._model_dir = None
+        self._dataset_dir = None
+
+    def extract(self):
+        """Crawl the fixture maps page and weapons category from scratch; returns collected_data"""
+        collector = self.collector
+        collector.state.reset()
+        collector.frontier.reset()
+        collector.collected_data = {category: {} for category in collector.collected_data}
+        maps_url = urlparse(self.manifest['maps_page']['url'])
+        category_url = urlparse(self.manifest['weapons_category']['url'])
+        with quiet():
+            collector.collect_maps_data(FIXTURE_SOURCE, f"{maps_url.scheme}://{maps_url.netloc}", maps_url.path)
+            collector.collect_weapons_data(FIXTURE_SOURCE, f"{category_url.scheme}://{category_url.netloc}",
+                                           category_url.path)
+        return collector.collected_data
+
+    def fetches(self):
+        stats = self.collector.fetcher.cache.stats()
+        return stats["hits"] + stats["misses"]
+
+    def collected_data(self):
+        if self._collected_data is None:
+            self._collected_data = copy.deepcopy(self.extract())
+        return self._collected_data
+
+    def create_training_data(self, collected_data):
+        """The collector's create_training_data() run over `collected_data`"""
+        saved = self.collector.collected_data
+        self.collector.collected_data = collected_data
+        try:
+            return self.collector.create_training_data()
+        finally:
+            self.collector.collected_data = saved
+
+    def training_examples(self):
+        return self.create_training_data(scale_collected_data(self.collected_data(), self.scale))
+
+    def tokenizer(self):
+        """The fixture BPE tokenizer with the training special tokens added"""
+        if self._tokenizer is None:
+            from transformers import GPT2TokenizerFast
+            from train_zombies_model import SPECIAL_TOKENS
+
+            model_fixture = os.path.join(FIXTURES_DIR, 'tiny_gpt2')
+            self._tokenizer = GPT2TokenizerFast(vocab_file=os.path.join(model_fixture, 'vocab.json'),
+                                                merges_file=os.path.join(model_fixture, 'merges.txt'))
+            self._tokenizer.add_special_tokens(SPECIAL_TOKENS)
+        return self._tokenizer
+
+    def model_dir(self):
+        """A seeded random tiny GPT-2 saved with the tokenizer, loadable by ZombiesBot"""
+        if self._model_dir is None:
+            import torch
+            from transformers import GPT2Config, GPT2LMHeadModel
+
+            tokenizer = self.tokenizer()
+            config = GPT2Config.from_json_file(os.path.join(FIXTURES_DIR, 'tiny_gpt2', 'config.json'))
+            config.vocab_size = len(tokenizer)
+            torch.manual_seed(0)
+            path = os.path.join(self.work_dir, 'tiny_gpt2')
+            GPT2LMHeadModel(config).save_pretrained(path)
+            tokenizer.save_pretrained(path)
+            self._model_dir = path
+        return self._model_dir
+
+    def dataset_dir(self):
+        if self._dataset_dir is None:
+            from zombies_dataset import write_dataset
+
+            collected_data = copy.deepcopy(self.collected_data())
+            training_data = self.create_training_data(collected_data)
+            self._dataset_dir = write_dataset(collected_data, training_data,
+                                              root=os.path.join(self.work_dir, 'datasets'))
+        return self._dataset_dir
+
+    def close(self):
+        self.collector.fetcher.close()
+        self.collector.fetcher.cache.close()
+        self.collector.state.close()
+        self.collector.cleaner.close()
+
+
+def bench_parse(ctx):
+    """get_soup (cache read + BeautifulSoup) and parse_content (lxml) over every fixture page"""
+    pages = manifest_pages(ctx.manifest)
+    urls = [url for url, _ in pages]
+    htmls = [read_page(filename) for _, filename in pages]
+    megabytes = sum(len(html.encode('utf-8')) for html in htmls) / 1e6
+
+    soup_seconds, _ = best_of(ctx.repeat, lambda: [ctx.collector.get_soup(url) for url in urls])
+    parse_seconds, _ = best_of(ctx.repeat, lambda: [parse_content(html) for html in htmls])
+    return {
+        "pages": len(pages),
+        "megabytes": round(megabytes, 3),
+        "get_soup_pages_per_second": rate(len(pages), soup_seconds),
+        "get_soup_mb_per_second": rate(megabytes, soup_seconds),
+        "parse_content_pages_per_second": rate(len(pages), parse_seconds),
+        "parse_content_mb_per_second": rate(megabytes, parse_seconds)
+    }
+
+
+def bench_extract(ctx):
+    """collect_maps_data and collect_weapons_data: link discovery, fetching from the cache and extraction"""
+    before = ctx.fetches()
+    ctx.extract()
+    pages = ctx.fetches() - before
+    seconds, collected_data = best_of(ctx.repeat, ctx.extract)
+    return {
+        "pages_fetched": pages,
+        "maps": len(collected_data["maps"]),
+        "weapons": len(collected_data["weapons"]),
+        "pages_per_second": rate(pages, seconds)
+    }
+
+
+def bench_clean(ctx):
+    """ZombiesDataCleaner over the extracted sections, the IGN guide and the transcripts"""
+    texts = []
+    for category in ('maps', 'weapons'):
+        for record in ctx.collected_data()[category].values():
+            texts.append(record["description"])
+            texts.extend(text for value in record.values() if isinstance(value, list) for text in value)
+    for page in ctx.manifest['guides']:
+        # Same selection as collect_guide_data
+        soup = ctx.collector.get_soup(page['url'])
+        texts.append((soup.find('article') or soup.find('div', class_='article-content')).get_text())
+    transcripts = [" ".join(entry['text'] for entry in entries) for entries in ctx.transcripts.values()]
+    texts = (texts + transcripts) * ctx.scale
+    transcripts = transcripts * ctx.scale
+    cleaner = ctx.collector.cleaner
+
+    seconds, sentence_lists = best_of(ctx.repeat,
+                                      lambda: cleaner.clean_and_split_many(texts, RELEVANCE_KEYWORDS))
+
+    def clean_transcripts():
+        # The per-video path collect_youtube_data takes
+        sentences = []
+        for text in transcripts:
+            cleaned_text = cleaner.clean_text(text)
+            if cleaner.is_relevant(cleaned_text, RELEVANCE_KEYWORDS):
+                sentences.extend(cleaner.structure_sentences(cleaned_text))
+        return sentences
+
+    transcript_seconds, _ = best_of(ctx.repeat, clean_transcripts)
+    return {
+        "texts": len(texts),
+        "sentences": sum(len(sentences) for sentences in sentence_lists),
+        "texts_per_second": rate(len(texts), seconds),
+        "chars_per_second": rate(sum(len(text) for text in texts), seconds),
+        "transcript_chars_per_second": rate(sum(len(text) for text in transcripts), transcript_seconds)
+    }
+
+
+def bench_training_data(ctx):
+    """create_training_data over `--scale` copies of the extracted records"""
+    scaled = scale_collected_data(ctx.collected_data(), ctx.scale)
+    seconds, examples = best_of(ctx.repeat, lambda: ctx.create_training_data(scaled))
+    records = sum(len(records) for records in scaled.values())
+    return {
+        "records": records,
+        "examples": len(examples),
+        "records_per_second": rate(records, seconds),
+        "examples_per_second": rate(len(examples), seconds)
+    }
+
+
+def bench_tokenize(ctx):
+    """build_packed_corpus on the scaled training examples, with an empty cache each run"""
+    from train_zombies_model import build_packed_corpus
+
+    examples = ctx.training_examples()
+    tokenizer = ctx.tokenizer()
+
+    def tokenize():
+        with quiet():
+            return build_packed_corpus(examples, tokenizer, BLOCK_SIZE, cache_dir=tempfile.mkdtemp(dir=ctx.work_dir))
+
+    seconds, blocks = best_of(ctx.repeat, tokenize)
+    return {
+        "examples": len(examples),
+        "packed_tokens": int(blocks.size),
+        "examples_per_second": rate(len(examples), seconds),
+        "tokens_per_second": rate(int(blocks.size), seconds)
+    }
+
+
+def wrong_kb_answers(index):
+    """The KB_EXPECTED_ANSWERS questions the index answers with another passage, or not at all"""
+    from zombies_index import normalize_name
+
+    wrong = []
+    for question, expected in KB_EXPECTED_ANSWERS:
+        answer = index.answer(question)
+        if expected is None:
+            if answer is not None:
+                wrong.append(question)
+            continue
+        name, field = expected
+        passages = [index.passages[index.record_passages[name_id][field]]
+                    for name_id in index.name_ids[normalize_name(name)] if field in index.record_passages[name_id]]
+        if answer not in passages:
+            wrong.append(question)
+    return wrong
+
+
+def bench_generate(ctx):
+    """ZombiesBot.generate_response latency, generated and answered from the knowledge base"""
+    import torch
+    from zombies_chat import ZombiesBot
+
+    with quiet():
+        bot = ZombiesBot(model_dir=ctx.model_dir(), knowledge_base_path=ctx.dataset_dir())
+    torch.manual_seed(0)
+    bot.generate_response(PROMPTS[0], max_length=GENERATE_MAX_LENGTH, use_knowledge_base=False)
+
+    latencies, kb_latencies, answered = [], [], 0
+    for _ in range(ctx.repeat):
+        for prompt in PROMPTS:
+            start = time.perf_counter()
+            bot.generate_response(prompt, max_length=GENERATE_MAX_LENGTH, use_knowledge_base=False)
+            latencies.append(time.perf_counter() - start)
+        for question in KB_QUESTIONS:
+            start = time.perf_counter()
+            answer = bot.answer_from_knowledge_base(question)
+            kb_latencies.append(time.perf_counter() - start)
+            answered += answer is not None
+    wrong = wrong_kb_answers(bot.index)
+    for question in wrong:
+        print(f"Wrong knowledge base answer: {question!r}")
+    return {
+        "responses": len(latencies),
+        "kb_answered": answered,
+        "kb_wrong_answers": len(wrong),
+        "p50_ms": percentile_ms(latencies, 0.5),
+        "p95_ms": percentile_ms(latencies, 0.95),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "kb_p50_ms": percentile_ms(kb_latencies, 0.5),
+        "kb_p95_ms": percentile_ms(kb_latencies, 0.95)
+    }
+
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'extract': bench_extract,
+    'clean': bench_clean,
+    'training_data': bench_training_data,
+    'tokenize': bench_tokenize,
+    'generate': bench_generate,
+}
+
+
+def package_version(name):
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        # Without NLTK's punkt data, sentences are split with a regex instead
+        "nltk_punkt": ensure_nltk_resource('punkt', offline=True),
+        "packages": {name: package_version(name) for name in
+                     ['lxml', 'beautifulsoup4', 'nltk', 'numpy', 'torch', 'transformers', 'tokenizers']}
+    }
+
+
+def is_timed(metric):
+    return metric.endswith('_per_second') or metric.endswith('_ms')
+
+
+def threshold_for(key, thresholds, default):
+    return thresholds.get(key, thresholds.get(key.split('.')[0], default))
+
+
+def compare(results, baseline, default_threshold):
+    """Rows of (metric, baseline value, current value, change, status); change > 0 is an improvement"""
+    thresholds = baseline.get('thresholds', {})
+    rows = []
+    for name, values in results['benchmarks'].items():
+        base_values = baseline.get('benchmarks', {}).get(name)
+        if base_values is None:
+            continue
+        for metric, value in values.items():
+            key = f'{name}.{metric}'
+            base = base_values.get(metric)
+            if not is_timed(metric):
+                if base is not None and base != value:
+                    print(f"Warning: {key} is {value} but was {base} in the baseline; "
+                          f"the workload changed, so its timings are not comparable")
+                continue
+            if not base or value is None:
+                rows.append((key, base, value, None, 'new'))
+                continue
+            change = (value - base) / base
+            if metric.endswith('_ms'):
+                change = -change
+            limit = threshold_for(key, thresholds, default_threshold)
+            rows.append((key, base, value, change, 'REGRESSION' if change < -limit else 'ok'))
+    return rows
+
+
+def print_results(results):
+    for name, values in results['benchmarks'].items():
+        print(f"\n{name}")
+        for metric, value in values.items():
+            print(f"  {metric:<32} {value}")
+
+
+def print_comparison(rows):
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, base, value, change, status in rows:
+        change_text = f"{change:+.0%}" if change is not None else ''
+        print(f"{key:<45} {str(base):>12} {str(value):>12} {change_text:>8}  {status}")
+
+
+def record_fixtures(manifest):
+    """Overwrite every fixture page with the live page at its URL"""
+    from zombies_fetcher import ZombiesFetcher
+
+    fetcher = ZombiesFetcher(max_workers=2, requests_per_second=1.0)
+    kept = 0
+    try:
+        for url, filename in manifest_pages(manifest):
+            result = fetcher.fetch(url)
+            if not result:
+                print(f"Could not record {url}; keeping {filename}")
+                kept += 1
+                continue
+            with open(os.path.join(FIXTURES_DIR, 'pages', filename), 'w', encoding='utf-8') as f:
+                f.write(result.text)
+            print(f"Recorded {url} -> {filename}")
+    finally:
+        fetcher.close()
+    if not kept and manifest.get('synthetic'):
+        # Every page is a real one now
+        manifest['synthetic'] = False
+        with open(os.path.join(FIXTURES_DIR, 'pages.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with regression thresholds")
+    parser.add_argument('--only', default=None,
+                        help=f"Comma-separated benchmarks to run (default: all of {','.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Runs per benchmark; throughput uses the fastest run")
+    parser.add_argument('--scale', type=int, default=50,
+                        help="Copies of the fixture records used by the clean/training/tokenize benchmarks")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=None,
+                        help=f"Allowed slowdown as a fraction of the baseline (default: the baseline's "
+                             f"\"default\" threshold, else {DEFAULT_THRESHOLD})")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store these results as the baseline instead of comparing against it")
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help="Exit 0 when there is no baseline to compare with, instead of failing")
+    parser.add_argument('--record', action='store_true',
+                        help="Refresh the fixture pages from the live sites and exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.record:
+        record_fixtures(load_manifest())
+        return 0
+    selected = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}")
+        return 2
+
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat, "scale": args.scale,
+               "synthetic_fixtures": load_manifest().get('synthetic', False),
+               "environment": environment(), "benchmarks": {}}
+    work_dir = tempfile.mkdtemp(prefix='zombies-bench-')
+    try:
+        ctx = BenchmarkContext(work_dir, args.repeat, args.scale)
+        try:
+            for name in selected:
+                print(f"Running {name}...", flush=True)
+                results["benchmarks"][name] = BENCHMARKS[name](ctx)
+        finally:
+            ctx.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    if results["synthetic_fixtures"]:
+        print("\nThe fixture pages are synthetic; parse/extract timings don't reflect real Fandom markup")
+    print(f"\nResults written to {args.output}")
+    # Wrong answers fail the run whatever the timings; they aren't compared with the baseline
+    wrong = [f"{name}.{metric}" for name, values in results["benchmarks"].items()
+             for metric, value in values.items() if metric.endswith('_wrong_answers') and value]
+    if wrong:
+        print(f"\nWrong answers: {', '.join(wrong)}")
+        return 1
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        # Benchmarks left out with --only keep their stored values, and thresholds are kept
+        baseline.setdefault('thresholds', {"default": DEFAULT_THRESHOLD})
+        baseline.setdefault('benchmarks', {}).update(results["benchmarks"])
+        baseline.update({key: results[key] for key in ['created', 'repeat', 'scale', 'environment']})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        # Otherwise a checkout without a baseline would pass the gate whatever the timings
+        return 0 if args.allow_missing_baseline else 1
+    base_env = baseline.get('environment', {})
+    for key in ['python', 'machine', 'cpus']:
+        if base_env.get(key) != results['environment'][key]:
+            print(f"Warning: baseline was recorded with {key}={base_env.get(key)}, "
+                  f"this run has {results['environment'][key]}")
+    if baseline.get('scale') != args.scale or baseline.get('repeat') != args.repeat:
+        print("Warning: --scale/--repeat differ from the baseline's")
+
+    default_threshold = args.threshold if args.threshold is not None else \
+        baseline.get('thresholds', {}).get('default', DEFAULT_THRESHOLD)
+    rows = compare(results, baseline, default_threshold)
+    print_comparison(rows)
+    regressions = [row[0] for row in rows if row[4] == 'REGRESSION']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond the threshold: {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions beyond the threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Fire a burst of concurrent requests at zombies_server.py and report throughput.
+
+Usage: python benchmarks/server_load.py [--url http://127.0.0.1:8000] [--requests 64] [--concurrency 16]
+
+Compare a server started with --max-batch-size 1 (serial generation) against
+the default batch size to see what dynamic batching buys.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PROMPTS = [
+    "What is the best strategy for Origins?",
+    "How do I build the Ice Staff?",
+    "Tell me about TranZit",
+    "What perks should I buy first?",
+    "How do you survive high rounds on Buried?",
+    "What does Mule Kick do?",
+]
+
+
+def post(url, prompt, max_new_tokens, timeout):
+    body = json.dumps({"prompt": prompt, "max_new_tokens": max_new_tokens}).encode('utf-8')
+    request = urllib.request.Request(f'{url}/generate', data=body,
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst load test for the Zombies Bot server")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--max-new-tokens', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda p: post(args.url, p, args.max_new_tokens, args.timeout), prompts))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for status, latency in results if status == 200]
+    errors = len(results) - len(latencies)
+    print(f"{len(latencies)} ok, {errors} failed in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.2f} req/s)")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms")
+    with urllib.request.urlopen(f'{args.url}/health', timeout=args.timeout) as response:
+        print(json.loads(response.read()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare per-response latency with and without the speculative decoding draft model.
+
+Usage: python benchmarks/speculative_latency.py [--model-dir ./zombies_model_final]
+           [--draft-model-dir ./zombies_draft_final] [--draft-tokens 4] [--knowledge-base DATASET]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zombies_chat import ChatSession, ZombiesBot
+
+PROMPTS = [
+    "What is the best strategy for Origins?",
+    "How do I build the Ice Staff?",
+    "What perks should I buy first?",
+    "How do you survive high rounds on Buried?",
+    "What does Mule Kick do?",
+]
+
+
+def time_responses(bot, max_new_tokens, repeats):
+    import torch
+
+    torch.manual_seed(0)
+    latencies, tokens = [], 0
+    for _ in range(repeats):
+        for prompt in PROMPTS:
+            session = ChatSession()
+            start = time.perf_counter()
+            reply = "".join(bot.stream_response(session, prompt, max_new_tokens=max_new_tokens))
+            latencies.append(time.perf_counter() - start)
+            tokens += len(bot.tokenizer.encode(reply))
+    return latencies, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speculative decoding latency comparison")
+    parser.add_argument('--model-dir', default='./zombies_model_final')
+    parser.add_argument('--draft-model-dir', default='./zombies_draft_final')
+    parser.add_argument('--knowledge-base', default=None,
+                        help="Dataset directory (default: latest collected dataset)")
+    parser.add_argument('--draft-tokens', type=int, default=4)
+    parser.add_argument('--max-new-tokens', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    bot = ZombiesBot(model_dir=args.model_dir, knowledge_base_path=args.knowledge_base,
+                     draft_model_dir=args.draft_model_dir, num_draft_tokens=args.draft_tokens)
+    speculative = bot.speculative
+
+    bot.speculative = None
+    baseline, baseline_tokens = time_responses(bot, args.max_new_tokens, args.repeats)
+    bot.speculative = speculative
+    drafted, drafted_tokens = time_responses(bot, args.max_new_tokens, args.repeats)
+
+    for name, latencies, tokens in [("standard", baseline, baseline_tokens),
+                                    ("speculative", drafted, drafted_tokens)]:
+        print(f"{name:<12} mean {statistics.mean(latencies) * 1000:7.0f} ms/response, "
+              f"{tokens / sum(latencies):6.1f} tokens/s")
+    print(f"acceptance rate {speculative.acceptance_rate():.0%}, "
+          f"{speculative.tokens_per_pass():.2f} tokens per model pass")
+
+
+if __name__ == "__main__":
+    main()
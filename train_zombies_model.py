@@ -1,66 +1,455 @@
+import argparse
+import hashlib
+import os
+import random
+import time
 import torch
-from transformers import GPT2Tokenizer, GPT2LMHeadModel, GPT2Config
-from transformers import Trainer, TrainingArguments
+import numpy as np
+from transformers import GPT2Config, GPT2TokenizerFast, GPT2LMHeadModel
+from transformers import Trainer, TrainerCallback, TrainingArguments, default_data_collator
 import json
-from datasets import Dataset
-import pandas as pd
+from torch.utils.data import Dataset
+from zombies_dataset import load_training_examples, resolve_dataset
+from zombies_metrics import RATE_BUCKETS, metrics, profiled
+
+SPECIAL_TOKENS = {
+    'pad_token': '<pad>',
+    'sep_token': '<sep>',
+    'additional_special_tokens': ['<map>', '<weapon>', '<perk>', '<location>']
+}
+TOKENIZED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'tokenized')
+TOKENIZE_BATCH_SIZE = 1000
+GLOBAL_BATCH_SIZE = 4
+PER_DEVICE_BATCH_SIZE = 4
+# Written next to each checkpoint: how it was trained, and the hashes of the examples it has seen
+LINEAGE_FILE = 'lineage.json'
+TRAINED_EXAMPLES_FILE = 'trained_examples.txt'
+# Part of the tokenized cache key; bumped when the packed layout changes, so stale blocks aren't reused
+CORPUS_FORMAT = 2
+
+def example_hash(example):
+    """Content hash identifying a question/answer pair"""
+    content = json.dumps([example["question"], example["answer"]], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def split_examples(training_data, eval_fraction=0.2):
+    """Deterministic train/eval split by content hash, so an example keeps its side across runs"""
+    train, held_out = [], []
+    for example in training_data:
+        bucket = int(example_hash(example)[:8], 16) / 0xFFFFFFFF
+        (held_out if bucket < eval_fraction else train).append(example)
+    return train, held_out
+
+def read_lineage(model_dir):
+    """(lineage, hashes of the examples the checkpoint was trained on), or (None, empty set)"""
+    lineage_path = os.path.join(model_dir, LINEAGE_FILE)
+    hashes_path = os.path.join(model_dir, TRAINED_EXAMPLES_FILE)
+    if not (os.path.exists(lineage_path) and os.path.exists(hashes_path)):
+        return None, set()
+    with open(lineage_path, 'r', encoding='utf-8') as f:
+        lineage = json.load(f)
+    with open(hashes_path, 'r', encoding='ascii') as f:
+        return lineage, {line.strip() for line in f if line.strip()}
+
+def write_lineage(model_dir, lineage, examples):
+    with open(os.path.join(model_dir, TRAINED_EXAMPLES_FILE), 'w', encoding='ascii') as f:
+        f.writelines(f"{example_hash(example)}\n" for example in examples)
+    with open(os.path.join(model_dir, LINEAGE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(lineage, f, indent=2)
+
+def plan_incremental(train_examples, trained_hashes, replay_fraction=0.25, seed=0):
+    """Split the training set against a checkpoint's trained hashes: returns the new or
+    changed examples, a replay sample of already-trained ones (`replay_fraction` times as
+    many as the new ones) and how many trained examples are no longer in the data"""
+    hashes = [example_hash(example) for example in train_examples]
+    new = [example for example, digest in zip(train_examples, hashes) if digest not in trained_hashes]
+    seen = sorted(((digest, example) for example, digest in zip(train_examples, hashes) if digest in trained_hashes),
+                  key=lambda pair: pair[0])
+    # Sampled in hash order with a fixed seed, so every rank (and every rerun) picks the same replay set
+    replay_count = min(len(seen), round(len(new) * replay_fraction))
+    replay = [example for _, example in random.Random(seed).sample(seen, replay_count)]
+    removed = len(trained_hashes - set(hashes))
+    return new, replay, removed
+
+def format_example(example, tokenizer):
+    # <sep> splits question from answer and EOS closes each example, so packed
+    # neighbours are delimited the same way GPT-2 saw documents in pre-training
+    return f"{example['question']}{tokenizer.sep_token}{example['answer']}{tokenizer.eos_token}"
+
+def corpus_cache_key(examples, tokenizer, block_size):
+    digest = hashlib.sha256()
+    for example in examples:
+        digest.update(example_hash(example).encode('ascii'))
+    tokenizer_id = json.dumps([CORPUS_FORMAT, type(tokenizer).__name__, tokenizer.name_or_path, len(tokenizer),
+                               tokenizer.all_special_tokens, block_size])
+    digest.update(tokenizer_id.encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+def build_packed_corpus(examples, tokenizer, block_size, cache_dir=TOKENIZED_CACHE_DIR):
+    """Tokenize and pack examples into fixed-length blocks, cached as a memory-mapped .npy"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'{corpus_cache_key(examples, tokenizer, block_size)}.npy')
+    if os.path.exists(path):
+        print(f"Using cached tokenized corpus {path}")
+        return np.load(path, mmap_mode='r')
+
+    token_ids = []
+    for start in range(0, len(examples), TOKENIZE_BATCH_SIZE):
+        batch = [format_example(example, tokenizer) for example in examples[start:start + TOKENIZE_BATCH_SIZE]]
+        for ids in tokenizer(batch, add_special_tokens=False)['input_ids']:
+            token_ids.extend(ids)
+
+    # Consecutive examples share blocks, so only the last block is padded. It holds the
+    # newest examples, and the lineage records them as trained, so none may be dropped.
+    dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+    num_blocks = -(-len(token_ids) // block_size)
+    blocks = np.full(num_blocks * block_size, tokenizer.pad_token_id, dtype=dtype)
+    blocks[:len(token_ids)] = token_ids
+    blocks = blocks.reshape(num_blocks, block_size)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+    np.save(tmp_path, blocks)
+    os.replace(tmp_path, path)
+    print(f"Packed {len(examples)} examples ({len(token_ids)} tokens) into {len(blocks)} blocks")
+    return np.load(path, mmap_mode='r')
+
+def setup_distributed(threads_per_rank=None):
+    """Join the process group when launched by torchrun with several processes, and
+    set this rank's intra-op threads. Returns (rank, world_size).
+
+    torchrun sets OMP_NUM_THREADS=1 for every rank, which leaves most cores idle on
+    a CPU node; by default each rank gets an equal share of the node's cores instead.
+    """
+    rank = int(os.environ.get('RANK', 0))
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    local_world_size = int(os.environ.get('LOCAL_WORLD_SIZE', 1))
+    if threads_per_rank is None and world_size > 1:
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        threads_per_rank = max(1, cores // local_world_size)
+    if threads_per_rank:
+        torch.set_num_threads(threads_per_rank)
+    if world_size > 1 and not torch.distributed.is_initialized():
+        # Initialized here so the Trainer uses gloo rather than whatever backend it would pick
+        torch.distributed.init_process_group('nccl' if torch.cuda.is_available() else 'gloo')
+    return rank, world_size
+
+def is_main_process():
+    return int(os.environ.get('RANK', 0)) == 0
+
+def batch_plan(global_batch_size, per_device_batch_size, world_size):
+    """(per-device batch, gradient accumulation steps) that add up to `global_batch_size`
+    blocks per optimizer step across `world_size` ranks, so adding ranks doesn't change
+    the optimization, only how fast it runs"""
+    if global_batch_size % world_size:
+        raise ValueError(f"Global batch size {global_batch_size} is not a multiple of {world_size} processes")
+    per_rank = global_batch_size // world_size
+    per_device = min(per_device_batch_size, per_rank)
+    while per_rank % per_device:
+        per_device -= 1
+    return per_device, per_rank // per_device
+
+class PackedBlockDataset(Dataset):
+    """Serves causal-LM training items straight from a memory-mapped block array.
+
+    The first token of each example isn't a label, so no loss is taken on predicting
+    it from the example before, and padding at the end of the last block is neither
+    attended to nor a label. Attention still crosses example boundaries within a
+    block, and position ids run on across them: GPT-2 in the pinned transformers
+    only takes a 2D attention mask, so a block-diagonal one can't be passed. The EOS
+    closing each example is the only separator, as between documents in GPT-2's
+    pre-training.
+    """
+
+    def __init__(self, blocks, eos_token_id, pad_token_id):
+        self.blocks = blocks
+        self.eos_token_id = eos_token_id
+        self.pad_token_id = pad_token_id
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __getitem__(self, idx):
+        input_ids = torch.from_numpy(self.blocks[idx].astype(np.int64))
+        labels = input_ids.clone()
+        # The model shifts labels left, so label i is predicted at position i - 1
+        labels[1:][input_ids[:-1] == self.eos_token_id] = -100
+        padding = input_ids == self.pad_token_id
+        labels[padding] = -100
+        return {
+            'input_ids': input_ids,
+            'attention_mask': (~padding).long(),
+            'labels': labels
+        }
+
+class MetricsCallback(TrainerCallback):
+    """Optimizer step time, training tokens/sec and losses, recorded when --profile is on"""
+
+    def __init__(self, model_name, tokens_per_step):
+        self.model_name = model_name
+        # Blocks are packed to a fixed length, so every full step sees the same number of tokens
+        self.tokens_per_step = tokens_per_step
+        self.step_start = None
+        self.tokens = 0
+        self.seconds = 0.0
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self.step_start = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        seconds = time.perf_counter() - self.step_start
+        metrics.observe('train_step_seconds', seconds, model=self.model_name)
+        metrics.inc('train_tokens_total', self.tokens_per_step, model=self.model_name)
+        metrics.observe('train_tokens_per_second', self.tokens_per_step / seconds,
+                        buckets=RATE_BUCKETS, model=self.model_name)
+        self.tokens += self.tokens_per_step
+        self.seconds += seconds
+
+    def on_train_end(self, args, state, control, **kwargs):
+        if self.seconds:
+            metrics.set('train_throughput_tokens_per_second', round(self.tokens / self.seconds, 1),
+                        model=self.model_name)
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        for key, name in [('loss', 'train_loss'), ('eval_loss', 'eval_loss'), ('learning_rate', 'train_learning_rate')]:
+            if logs and key in logs:
+                metrics.set(name, logs[key], model=self.model_name)
+
+def fine_tune(model, tokenizer, train_dataset, eval_dataset, run_dir, output_dir,
+              global_batch_size=GLOBAL_BATCH_SIZE, per_device_batch_size=PER_DEVICE_BATCH_SIZE, num_train_epochs=5,
+              warmup_steps=500, warmup_ratio=0.0):
+    """Train `model` (on every rank, under torchrun) and save it to `output_dir` from
+    rank 0; returns the run's throughput figures"""
+    has_eval = len(eval_dataset) > 0
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    per_device, accumulation_steps = batch_plan(global_batch_size, per_device_batch_size, world_size)
 
-def train_model():
-    print("Loading data...")
-    # Load the training data
-    with open('zombies_dataset_training_[TIMESTAMP].json', 'r', encoding='utf-8') as f:
-        training_data = json.load(f)
-    
-    print("Initializing model...")
-    # Initialize model and tokenizer
-    tokenizer = GPT2Tokenizer.from_pretrained('gpt2')
-    model = GPT2LMHeadModel.from_pretrained('gpt2')
-    
-    # Add special tokens
-    special_tokens = {
-        'pad_token': '<pad>',
-        'sep_token': '<sep>',
-        'additional_special_tokens': ['<map>', '<weapon>', '<perk>', '<location>']
-    }
-    tokenizer.add_special_tokens(special_tokens)
-    model.resize_token_embeddings(len(tokenizer))
-    
-    print("Preparing dataset...")
-    # Convert to DataFrame and then to Dataset
-    df = pd.DataFrame(training_data)
-    dataset = Dataset.from_pandas(df)
-    
     # Training arguments
     training_args = TrainingArguments(
-        output_dir="./zombies_model",
-        num_train_epochs=5,
-        per_device_train_batch_size=4,
-        per_device_eval_batch_size=4,
-        warmup_steps=500,
+        output_dir=run_dir,
+        num_train_epochs=num_train_epochs,
+        per_device_train_batch_size=per_device,
+        gradient_accumulation_steps=accumulation_steps,
+        per_device_eval_batch_size=per_device_batch_size,
+        warmup_steps=warmup_steps,
+        warmup_ratio=warmup_ratio,
         weight_decay=0.01,
         logging_dir='./logs',
         logging_steps=10,
         save_steps=500,
         eval_steps=100,
-        evaluation_strategy="steps",
-        load_best_model_at_end=True,
+        evaluation_strategy="steps" if has_eval else "no",
+        load_best_model_at_end=has_eval,
+        ddp_backend='nccl' if torch.cuda.is_available() else 'gloo',
+        # Every GPT-2 parameter gets a gradient, so DDP can skip searching for unused ones
+        ddp_find_unused_parameters=False,
     )
-    
+
+    callbacks = []
+    if metrics.enabled:
+        block_tokens = train_dataset.blocks.shape[1] if len(train_dataset) else 0
+        callbacks.append(MetricsCallback(os.path.basename(os.path.normpath(run_dir)),
+                                         block_tokens * training_args.train_batch_size
+                                         * training_args.gradient_accumulation_steps
+                                         * training_args.world_size))
+
     # Initialize trainer
     trainer = Trainer(
         model=model,
         args=training_args,
-        train_dataset=dataset.shuffle().select(range(int(len(dataset) * 0.8))),
-        eval_dataset=dataset.shuffle().select(range(int(len(dataset) * 0.2))),
+        train_dataset=train_dataset,
+        eval_dataset=eval_dataset if has_eval else None,
+        data_collator=default_data_collator,
+        callbacks=callbacks,
     )
-    
+
     print("Starting training...")
-    trainer.train()
-    
+    train_result = trainer.train()
+
+    # save_model only writes from rank 0; the other ranks hold identical weights
     print("Saving model...")
-    model.save_pretrained('./zombies_model_final')
-    tokenizer.save_pretrained('./zombies_model_final')
+    trainer.save_model(output_dir)
+    if trainer.is_world_process_zero():
+        tokenizer.save_pretrained(output_dir)
+
+    block_tokens = train_dataset.blocks.shape[1] if len(train_dataset) else 0
+    samples_per_second = train_result.metrics.get("train_samples_per_second", 0.0)
+    return {
+        "model": os.path.basename(os.path.normpath(output_dir)),
+        "world_size": world_size,
+        "nodes": world_size // int(os.environ.get('LOCAL_WORLD_SIZE', 1)),
+        "threads_per_rank": torch.get_num_threads(),
+        "global_batch_size": per_device * accumulation_steps * world_size,
+        "per_device_batch_size": per_device,
+        "gradient_accumulation_steps": accumulation_steps,
+        "steps": train_result.global_step,
+        "train_seconds": train_result.metrics.get("train_runtime"),
+        "samples_per_second": samples_per_second,
+        "tokens_per_second": round(samples_per_second * block_tokens, 1)
+    }
+
+def train_model(data_path=None, base_model='gpt2',
+                block_size=256, output_dir='./zombies_model_final', quantized_dir='./zombies_model_int8',
+                draft_model='distilgpt2', draft_output_dir='./zombies_draft_final',
+                global_batch_size=GLOBAL_BATCH_SIZE, per_device_batch_size=PER_DEVICE_BATCH_SIZE,
+                num_train_epochs=5, threads_per_rank=None, scaling_report=None,
+                incremental=False, replay_fraction=0.25):
+    # A no-op for plain `python train_zombies_model.py`; under torchrun every rank runs all of this
+    rank, world_size = setup_distributed(threads_per_rank)
+    if world_size > 1:
+        print(f"Rank {rank} of {world_size}, {torch.get_num_threads()} threads")
+    batch_settings = dict(global_batch_size=global_batch_size, per_device_batch_size=per_device_batch_size,
+                          num_train_epochs=num_train_epochs)
+
+    print("Loading data...")
+    # Load the training data (the latest collected dataset unless a path is given)
+    dataset_path = resolve_dataset(data_path)
+    training_data = load_training_examples(dataset_path)
+    train_examples, eval_examples = split_examples(training_data)
+
+    # With --incremental, continue from the last checkpoint on what changed since it was trained
+    lineage, trained_hashes = read_lineage(output_dir) if incremental else (None, set())
+    fit_examples, draft_examples = train_examples, train_examples
+    new_examples, replay_examples, removed = train_examples, [], 0
+    if incremental and lineage is None:
+        print(f"No lineage in {output_dir}; training from {base_model} on the whole dataset")
+    if lineage is not None:
+        new_examples, replay_examples, removed = plan_incremental(train_examples, trained_hashes, replay_fraction)
+        print(f"Since {lineage['dataset']}: {len(new_examples)} new or changed examples, "
+              f"{len(train_examples) - len(new_examples)} unchanged, {removed} removed")
+        if not new_examples:
+            print("Nothing new to train on; the checkpoint is up to date.")
+            return
+        fit_examples = new_examples + replay_examples
+        base_model = output_dir
+        if draft_output_dir and os.path.exists(os.path.join(draft_output_dir, 'config.json')):
+            draft_model, draft_examples = draft_output_dir, fit_examples
+        # A short run: warm up over a tenth of it rather than the full run's 500 steps
+        batch_settings.update(warmup_steps=0, warmup_ratio=0.1)
+        print(f"Fine-tuning {output_dir} on {len(new_examples)} new and {len(replay_examples)} replayed examples")
+
+    print("Initializing model...")
+    # Initialize model and tokenizer
+    tokenizer = GPT2TokenizerFast.from_pretrained(base_model)
+    model = GPT2LMHeadModel.from_pretrained(base_model)
+
+    # Add special tokens (a resumed checkpoint already has them)
+    tokenizer.add_special_tokens(SPECIAL_TOKENS)
+    model.resize_token_embeddings(len(tokenizer))
+    if draft_output_dir:
+        # The draft proposes token ids for the main model to verify, so the vocabularies must match;
+        # a fresh draft has the base vocabulary, a resumed one also has the special tokens
+        draft_vocab_size = GPT2Config.from_pretrained(draft_model).vocab_size
+        if draft_vocab_size not in (tokenizer.vocab_size, len(tokenizer)):
+            raise ValueError(f"Draft model {draft_model} has a {draft_vocab_size}-token vocabulary, "
+                             f"but {base_model} has {tokenizer.vocab_size}")
+
+    print("Preparing dataset...")
+    train_dataset = PackedBlockDataset(build_packed_corpus(fit_examples, tokenizer, block_size),
+                                       tokenizer.eos_token_id, tokenizer.pad_token_id)
+    # The whole held-out split, so forgetting of older examples shows up in eval loss
+    eval_dataset = PackedBlockDataset(build_packed_corpus(eval_examples, tokenizer, block_size),
+                                      tokenizer.eos_token_id, tokenizer.pad_token_id)
+
+    runs = [fine_tune(model, tokenizer, train_dataset, eval_dataset, "./zombies_model", output_dir,
+                      **batch_settings)]
+
+    if is_main_process():
+        write_lineage(output_dir, {
+            "dataset": dataset_path,
+            "base_model": base_model,
+            "mode": "incremental" if lineage is not None else "full",
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "train_examples": len(train_examples),
+            "new_examples": len(new_examples),
+            "replay_examples": len(replay_examples),
+            "removed_examples": removed,
+            "epochs": num_train_epochs,
+            "global_batch_size": global_batch_size,
+            "train_seconds": runs[0]["train_seconds"],
+            # Earlier runs, newest first
+            "history": ([{key: value for key, value in lineage.items() if key != "history"}]
+                        + lineage.get("history", [])) if lineage is not None else []
+        }, train_examples)
+
+    if quantized_dir and is_main_process():
+        # int8 copy for CPU-only inference hosts
+        from zombies_quantize import export_quantized
+        export_quantized(output_dir, quantized_dir)
+
+    if draft_output_dir:
+        # Small model for speculative decoding, trained on the same packed corpus
+        print(f"Training draft model from {draft_model}...")
+        draft = GPT2LMHeadModel.from_pretrained(draft_model)
+        draft.resize_token_embeddings(len(tokenizer))
+        if draft_examples is not fit_examples:
+            # No draft checkpoint to continue from, so a new draft is trained on everything
+            train_dataset = PackedBlockDataset(build_packed_corpus(draft_examples, tokenizer, block_size),
+                                               tokenizer.eos_token_id, tokenizer.pad_token_id)
+        runs.append(fine_tune(draft, tokenizer, train_dataset, eval_dataset, "./zombies_draft", draft_output_dir,
+                              **batch_settings))
+
+    if is_main_process():
+        for run in runs:
+            print(f"Scaling: {run['model']} on {run['world_size']} processes ({run['nodes']} nodes, "
+                  f"{run['threads_per_rank']} threads each): {run['train_seconds']}s, "
+                  f"{run['samples_per_second']} blocks/s, {run['tokens_per_second']} tokens/s")
+        if scaling_report:
+            with open(scaling_report, 'w', encoding='utf-8') as f:
+                json.dump(runs, f, indent=2)
     print("Training completed!")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fine-tune GPT-2 on the Zombies dataset")
+    parser.add_argument('--data', default=None,
+                        help="Dataset directory or legacy training JSON (default: latest collected dataset)")
+    parser.add_argument('--base-model', default='gpt2')
+    parser.add_argument('--block-size', type=int, default=256,
+                        help="Tokens per packed training block")
+    parser.add_argument('--output-dir', default='./zombies_model_final')
+    parser.add_argument('--quantized-dir', default='./zombies_model_int8',
+                        help="Where to export the int8 copy of the trained model")
+    parser.add_argument('--no-quantize', action='store_true',
+                        help="Skip exporting the int8 model")
+    parser.add_argument('--draft-model', default='distilgpt2',
+                        help="Base model for the speculative decoding draft; must use the GPT-2 vocabulary")
+    parser.add_argument('--draft-output-dir', default='./zombies_draft_final')
+    parser.add_argument('--no-draft', action='store_true',
+                        help="Skip training the draft model")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--incremental', action='store_true',
+                        help="Continue from the model in --output-dir, training only on examples added or "
+                             "changed since it was trained (plus a replay sample); does nothing if none were")
+    parser.add_argument('--replay-fraction', type=float, default=0.25,
+                        help="With --incremental, already-trained examples replayed per new example")
+    parser.add_argument('--global-batch-size', type=int, default=GLOBAL_BATCH_SIZE,
+                        help="Blocks per optimizer step across all processes; kept fixed under torchrun "
+                             "with gradient accumulation, so it must be a multiple of the process count")
+    parser.add_argument('--per-device-batch-size', type=int, default=PER_DEVICE_BATCH_SIZE,
+                        help="Largest batch each process runs at once")
+    parser.add_argument('--threads-per-rank', type=int, default=None,
+                        help="Intra-op threads per process under torchrun (default: the node's cores / processes on it)")
+    parser.add_argument('--scaling-report', default=None,
+                        help="Write each model's world size, batch plan and throughput to this JSON file")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record step time/tokens-per-second metrics and a cProfile of the run")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="Where --profile writes its .prom, .json and .prof files")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    train_model() 
\ No newline at end of file
+    args = parse_args()
+    # Under torchrun each rank writes its own profile
+    rank = int(os.environ.get('RANK', 0))
+    with profiled(args.profile, 'train' if rank == 0 else f'train-rank{rank}', args.profile_dir):
+        train_model(data_path=args.data, base_model=args.base_model,
+                    block_size=args.block_size, output_dir=args.output_dir,
+                    quantized_dir=None if args.no_quantize else args.quantized_dir,
+                    draft_model=args.draft_model,
+                    draft_output_dir=None if args.no_draft else args.draft_output_dir,
+                    global_batch_size=args.global_batch_size,
+                    per_device_batch_size=args.per_device_batch_size,
+                    num_train_epochs=args.epochs,
+                    threads_per_rank=args.threads_per_rank,
+                    scaling_report=args.scaling_report,
+                    incremental=args.incremental,
+                    replay_fraction=args.replay_fraction)
@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+CacheEntry = namedtuple('CacheEntry', ['url', 'final_url', 'body_hash', 'etag',
+                                       'last_modified', 'fetched_at', 'accessed_at'])
+
+
+class ZombiesHTTPCache:
+    """Content-addressed on-disk response cache with TTL and size-bounded LRU eviction.
+
+    Several processes can share one cache directory: every store runs in a single
+    write transaction that reads the cache's size from the index, so max_bytes
+    bounds what all of them write together.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, default_ttl=24 * 3600, host_ttls=None):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # host -> seconds a cached page is served without revalidation
+        self.host_ttls = dict(host_ttls or {})
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+        self.lock = threading.Lock()
+        # Other processes sharing the cache hold the write lock while they compress a page
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY, final_url TEXT, body_hash TEXT, etag TEXT,
+            last_modified TEXT, fetched_at REAL, accessed_at REAL)""")
+        self.db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entries_hash ON entries (body_hash)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS objects (hash TEXT PRIMARY KEY, size INTEGER)')
+        self.db.commit()
+        self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+
+    def object_path(self, body_hash):
+        return os.path.join(self.objects_dir, body_hash[:2], body_hash[2:] + '.gz')
+
+    def ttl_for(self, url):
+        return self.host_ttls.get(urlparse(url).netloc.lower(), self.default_ttl)
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.db.execute('SELECT * FROM entries WHERE url = ?', (url,)).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def is_fresh(self, entry):
+        return time.time() - entry.fetched_at < self.ttl_for(entry.url)
+
+    def read_body(self, entry):
+        try:
+            with gzip.open(self.object_path(entry.body_hash), 'rb') as f:
+                return f.read().decode('utf-8')
+        except OSError:
+            return None
+
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def touch(self, url, revalidated=False):
+        """Mark an entry as used; a 304 also restarts its TTL"""
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.revalidated += 1
+                self.db.execute('UPDATE entries SET accessed_at = ?, fetched_at = ? WHERE url = ?',
+                                (now, now, url))
+            else:
+                self.hits += 1
+                self.db.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (now, url))
+            self.db.commit()
+
+    def store(self, url, final_url, text, etag=None, last_modified=None):
+        body = text.encode('utf-8')
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self.object_path(body_hash)
+        now = time.time()
+        with self.lock:
+            # Take the write lock up front, so no other process stores or evicts between
+            # the checks below and the writes that depend on them
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+                if not self.db.execute('SELECT 1 FROM objects WHERE hash = ?', (body_hash,)).fetchone():
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                    with gzip.open(tmp_path, 'wb') as f:
+                        f.write(body)
+                    os.replace(tmp_path, path)
+                    size = os.path.getsize(path)
+                    if self.db.execute('INSERT OR IGNORE INTO objects VALUES (?, ?)', (body_hash, size)).rowcount:
+                        self.total_bytes += size
+                old = self.db.execute('SELECT body_hash FROM entries WHERE url = ?', (url,)).fetchone()
+                self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                (url, final_url, body_hash, etag, last_modified, now, now))
+                if old and old[0] != body_hash:
+                    self.drop_object_if_unused(old[0])
+                self.evict()
+            except BaseException:
+                self.db.rollback()
+                raise
+            self.db.commit()
+
+    def drop_object_if_unused(self, body_hash):
+        if self.db.execute('SELECT 1 FROM entries WHERE body_hash = ?', (body_hash,)).fetchone():
+            return
+        row = self.db.execute('SELECT size FROM objects WHERE hash = ?', (body_hash,)).fetchone()
+        if row:
+            self.db.execute('DELETE FROM objects WHERE hash = ?', (body_hash,))
+            self.total_bytes -= row[0]
+        try:
+            os.remove(self.object_path(body_hash))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while self.total_bytes > self.max_bytes:
+            row = self.db.execute(
+                'SELECT url, body_hash FROM entries ORDER BY accessed_at LIMIT 1').fetchone()
+            if not row:
+                break
+            self.db.execute('DELETE FROM entries WHERE url = ?', (row[0],))
+            self.drop_object_if_unused(row[1])
+
+    def stats(self):
+        # Read from the index, so the size includes what other processes stored
+        with self.lock:
+            self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "bytes": self.total_bytes
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -1,21 +1,103 @@
-from transformers import GPT2LMHeadModel, GPT2Tokenizer
-import torch
-import json
+import argparse
+import time
 
-class ZombiesBot:
+from zombies_metrics import RATE_BUCKETS, metrics, profiled
+
+# Context positions always left for the prompt; a longer reply would leave too little to answer from
+MIN_PROMPT_TOKENS = 32
+
+def record_generation(mode, tokens, seconds):
+    metrics.inc('generated_tokens_total', tokens, mode=mode)
+    metrics.observe('generation_seconds', seconds, mode=mode)
+    if seconds > 0:
+        metrics.observe('generation_tokens_per_second', tokens / seconds, buckets=RATE_BUCKETS, mode=mode)
+
+class ChatSession:
+    """One conversation: the tokens the model has seen and their cached keys/values"""
+    
     def __init__(self):
+        self.history = []          # Token ids already run through the model
+        self.turn_starts = []      # Offset in `history` where each turn begins
+        self.past_key_values = None
+        self.draft_past_key_values = None  # Draft model cache when decoding speculatively
+        self.pending = []          # Tokens to feed before the next turn (e.g. the closing EOS)
+    
+    def reset(self):
+        self.__init__()
+
+class ZombiesBot:
+    def __init__(self, model_dir='./zombies_model_final',
+                 knowledge_base_path=None, rag_passages=0,
+                 quantized=False, draft_model_dir=None, num_draft_tokens=4):
         print("Initializing Zombies Bot...")
-        self.tokenizer = GPT2Tokenizer.from_pretrained('./zombies_model_final')
-        self.model = GPT2LMHeadModel.from_pretrained('./zombies_model_final')
+        # torch/transformers are only imported once a bot is actually built
+        from transformers import GPT2LMHeadModel, GPT2Tokenizer
+        
+        self.tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
+        if quantized:
+            from zombies_quantize import load_quantized
+            self.model = load_quantized(model_dir)
+        else:
+            self.model = GPT2LMHeadModel.from_pretrained(model_dir)
         self.model.eval()
         
-        # Load structured data for reference
-        with open('zombies_dataset_structured_[TIMESTAMP].json', 'r', encoding='utf-8') as f:
-            self.knowledge_base = json.load(f)
+        # Optional small model that proposes tokens for the full model to verify
+        self.speculative = None
+        if draft_model_dir:
+            from zombies_speculative import SpeculativeDecoder
+            draft = GPT2LMHeadModel.from_pretrained(draft_model_dir)
+            draft.eval()
+            self.speculative = SpeculativeDecoder(self.model, draft, num_draft_tokens)
+        
+        # Memory-mapped index over the structured data (latest dataset by default, built on first use)
+        from zombies_index import ZombiesIndex
+        self.index = ZombiesIndex.open(knowledge_base_path)
+        self.rag_passages = rag_passages
     
-    def generate_response(self, prompt, max_length=200):
+    def check_max_new_tokens(self, max_new_tokens):
+        """Raise ValueError unless `max_new_tokens` leaves MIN_PROMPT_TOKENS of the context for the prompt"""
+        limit = self.model.config.n_positions - MIN_PROMPT_TOKENS
+        if not 1 <= max_new_tokens <= limit:
+            raise ValueError(f"max_new_tokens must be between 1 and {limit} for a "
+                             f"{self.model.config.n_positions}-token context, got {max_new_tokens}")
+    
+    def answer_from_knowledge_base(self, question):
+        """Direct answer for factual questions (stats, locations, ...), or None to generate one"""
+        with metrics.timer('kb_lookup_seconds'):
+            answer = self.index.answer(question)
+        metrics.inc('kb_questions_total', answered='yes' if answer else 'no')
+        return answer
+    
+    def build_prompt(self, question):
+        """Prefix the question with the top-ranked knowledge base passages, if enabled"""
+        if not self.rag_passages:
+            return question
+        passages = self.index.search(question, self.rag_passages)
+        context = " ".join(f"{p['name']}: {p['text']}" for p in passages)
+        return f"{context}\n{question}" if context else question
+    
+    def generate_response(self, prompt, max_length=200, use_knowledge_base=True):
+        if use_knowledge_base:
+            answer = self.answer_from_knowledge_base(prompt)
+            if answer:
+                return answer
+            prompt = self.build_prompt(prompt)
+        
         # Prepare input
         inputs = self.tokenizer.encode(prompt + self.tokenizer.sep_token, return_tensors='pt')
+        start = time.perf_counter()
+        
+        if self.speculative:
+            # Same sampling settings as generate() below, with draft tokens verified in bulk
+            from zombies_speculative import DecodeState
+            processors, warpers = self.sampling_processors(0.7, 50, 0.95, 3)
+            state = DecodeState(inputs[0].tolist())
+            for _ in self.speculative.sample(state, max_length - inputs.shape[1], processors, warpers,
+                                             {self.tokenizer.eos_token_id}):
+                pass
+            record_generation('single', len(state.tokens) - inputs.shape[1], time.perf_counter() - start)
+            response = self.tokenizer.decode(state.tokens, skip_special_tokens=True)
+            return response.replace(prompt, '').strip()
         
         # Generate response
         outputs = self.model.generate(
@@ -29,6 +111,7 @@ class ZombiesBot:
             pad_token_id=self.tokenizer.eos_token_id,
             no_repeat_ngram_size=3
         )
+        record_generation('single', outputs.shape[1] - inputs.shape[1], time.perf_counter() - start)
         
         response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
         
@@ -36,27 +119,240 @@ class ZombiesBot:
         response = response.replace(prompt, '').strip()
         return response
     
+    def generate_batch(self, prompts, max_new_tokens=200):
+        """Answer several prompts with a single left-padded `model.generate` call"""
+        responses = [self.answer_from_knowledge_base(prompt) for prompt in prompts]
+        pending = [i for i, response in enumerate(responses) if response is None]
+        if not pending:
+            return responses
+        
+        generated = self.generate_texts([self.build_prompt(prompts[i]) for i in pending], max_new_tokens)
+        for i, (response, _) in zip(pending, generated):
+            responses[i] = response
+        return responses
+    
+    def generate_texts(self, prompts, max_new_tokens=200, temperature=0.7, top_k=50, top_p=0.95,
+                       no_repeat_ngram_size=3):
+        """Generate the answer after each prompt in one `model.generate` call, without the
+        knowledge base; returns (response, generated token count) pairs. A temperature
+        of 0 decodes greedily."""
+        import torch
+        
+        self.check_max_new_tokens(max_new_tokens)
+        texts = [prompt + self.tokenizer.sep_token for prompt in prompts]
+        # Left padding keeps every prompt's last token at the end, where generation continues
+        self.tokenizer.padding_side = 'left'
+        pad_token_id = self.tokenizer.pad_token_id
+        if pad_token_id is None:
+            pad_token_id = self.tokenizer.eos_token_id
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        inputs = self.tokenizer(texts, return_tensors='pt', padding=True)
+        start = time.perf_counter()
+        
+        if temperature:
+            sampling = dict(do_sample=True, temperature=temperature, top_k=top_k, top_p=top_p)
+        else:
+            sampling = dict(do_sample=False)
+        
+        with torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                **sampling,
+                max_new_tokens=max_new_tokens,
+                pad_token_id=pad_token_id,
+                eos_token_id=[self.tokenizer.eos_token_id, self.tokenizer.sep_token_id],
+                no_repeat_ngram_size=no_repeat_ngram_size
+            )
+        
+        prompt_length = inputs['input_ids'].shape[1]
+        token_counts = (outputs[:, prompt_length:] != pad_token_id).sum(dim=1).tolist()
+        metrics.observe('generation_batch_size', len(prompts), buckets=RATE_BUCKETS)
+        record_generation('batch', sum(token_counts), time.perf_counter() - start)
+        return [(self.tokenizer.decode(output[prompt_length:], skip_special_tokens=True).strip(), count)
+                for output, count in zip(outputs, token_counts)]
+    
+    def sampling_processors(self, temperature, top_k, top_p, no_repeat_ngram_size):
+        from transformers import (LogitsProcessorList, NoRepeatNGramLogitsProcessor,
+                                  TemperatureLogitsWarper, TopKLogitsWarper, TopPLogitsWarper)
+        
+        processors = LogitsProcessorList([NoRepeatNGramLogitsProcessor(no_repeat_ngram_size)])
+        warpers = LogitsProcessorList([TemperatureLogitsWarper(temperature),
+                                       TopKLogitsWarper(top_k),
+                                       TopPLogitsWarper(top_p)])
+        return processors, warpers
+    
+    def stream_response(self, session, prompt, max_new_tokens=200, temperature=0.7,
+                        top_k=50, top_p=0.95, no_repeat_ngram_size=3):
+        """Yield the reply to `prompt` piece by piece, reusing the session's KV cache.
+
+        Only the new turn's tokens are run through the model; earlier turns come
+        from `session.past_key_values`. Generation stops at <sep>/EOS or after
+        `max_new_tokens`, and the oldest turns are dropped when the context is full.
+        """
+        self.check_max_new_tokens(max_new_tokens)
+        start = time.perf_counter()
+        processors, warpers = self.sampling_processors(temperature, top_k, top_p, no_repeat_ngram_size)
+        stop_ids = {self.tokenizer.eos_token_id, self.tokenizer.sep_token_id}
+        
+        prompt_ids = self.tokenizer.encode(prompt + self.tokenizer.sep_token)
+        new_ids = self.fit_context(session, session.pending + prompt_ids, max_new_tokens)
+        session.pending = []
+        turn_start = max(len(session.history) + len(new_ids) - len(prompt_ids), 0)
+        session.turn_starts.append(turn_start)
+        
+        sample = self.sample_speculative if self.speculative else self.sample_incremental
+        generated = []
+        emitted = ""
+        for new_tokens in sample(session, new_ids, turn_start, max_new_tokens, processors, warpers, stop_ids):
+            generated.extend(new_tokens)
+            text = self.tokenizer.decode(generated, skip_special_tokens=True,
+                                         clean_up_tokenization_spaces=False)
+            # Hold back a partially decoded multi-byte character
+            if not text.endswith('\ufffd') and len(text) > len(emitted):
+                if not emitted:
+                    metrics.observe('time_to_first_token_seconds', time.perf_counter() - start)
+                yield text[len(emitted):]
+                emitted = text
+        # Close the turn the way training examples end
+        session.pending.append(self.tokenizer.eos_token_id)
+        record_generation('stream', len(generated), time.perf_counter() - start)
+        if self.speculative:
+            metrics.set('speculative_acceptance_rate', round(self.speculative.acceptance_rate(), 4))
+            metrics.set('speculative_tokens_per_pass', round(self.speculative.tokens_per_pass(), 4))
+        
+        text = self.tokenizer.decode(generated, skip_special_tokens=True,
+                                     clean_up_tokenization_spaces=False)
+        if len(text) > len(emitted):
+            yield text[len(emitted):]
+    
+    def sample_incremental(self, session, new_ids, turn_start, max_new_tokens, processors, warpers, stop_ids):
+        """Sample one token per forward pass, yielding each as a one-item list"""
+        import torch
+        
+        turn_ids = (session.history + new_ids)[turn_start:]
+        next_id = None
+        input_ids = torch.tensor([new_ids])
+        with torch.no_grad():
+            for _ in range(max_new_tokens):
+                outputs = self.model(input_ids=input_ids, past_key_values=session.past_key_values,
+                                     use_cache=True)
+                session.past_key_values = outputs.past_key_values
+                session.history.extend(input_ids[0].tolist())
+                
+                context = torch.tensor([turn_ids])
+                scores = warpers(context, processors(context, outputs.logits[:, -1, :]))
+                next_id = torch.multinomial(torch.softmax(scores, dim=-1), num_samples=1).item()
+                if next_id in stop_ids:
+                    return
+                turn_ids.append(next_id)
+                yield [next_id]
+                input_ids = torch.tensor([[next_id]])
+        # The last sampled token hasn't been run through the model yet
+        if next_id is not None:
+            session.pending.append(next_id)
+    
+    def sample_speculative(self, session, new_ids, turn_start, max_new_tokens, processors, warpers, stop_ids):
+        """Sample with the draft model proposing tokens, yielding each verified run of them"""
+        from zombies_speculative import DecodeState, cache_length
+        
+        state = DecodeState(session.history + new_ids, session.past_key_values, session.draft_past_key_values)
+        yield from self.speculative.sample(state, max_new_tokens, processors, warpers, stop_ids,
+                                           context_start=turn_start)
+        fed = cache_length(state.target_past)
+        session.history = state.tokens[:fed]
+        session.past_key_values = state.target_past
+        session.draft_past_key_values = state.draft_past
+        session.pending.extend(state.tokens[fed:])
+    
+    def fit_context(self, session, new_ids, max_new_tokens):
+        """Drop the oldest turns so the new turn and its reply fit the context window"""
+        limit = self.model.config.n_positions
+        if len(session.history) + len(new_ids) + max_new_tokens <= limit:
+            return new_ids
+        
+        # GPT-2 positions are absolute, so the kept history has to be re-encoded
+        keep_from = len(session.history)
+        for start in session.turn_starts:
+            if len(session.history) - start + len(new_ids) + max_new_tokens <= limit:
+                keep_from = start
+                break
+        kept = session.history[keep_from:]
+        new_ids = (kept + new_ids)[-max(limit - max_new_tokens, 1):]
+        session.history = []
+        session.turn_starts = [start - keep_from for start in session.turn_starts if start >= keep_from]
+        session.past_key_values = None
+        session.draft_past_key_values = None
+        return new_ids
+    
     def get_specific_info(self, query_type, name):
         """Get specific information from knowledge base"""
-        if query_type in self.knowledge_base:
-            if name in self.knowledge_base[query_type]:
-                return self.knowledge_base[query_type][name]
-        return None
+        return self.index.get_record(query_type, name)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Chat with the Zombies Bot")
+    parser.add_argument('--model-dir', default='./zombies_model_final')
+    parser.add_argument('--knowledge-base', default=None,
+                        help="Dataset directory or legacy structured JSON (default: latest collected dataset)")
+    parser.add_argument('--max-new-tokens', type=int, default=200)
+    parser.add_argument('--quantized', action='store_true',
+                        help="--model-dir holds an int8 checkpoint from zombies_quantize.py")
+    parser.add_argument('--draft-model-dir', default=None,
+                        help="Draft model for speculative decoding, e.g. ./zombies_draft_final")
+    parser.add_argument('--draft-tokens', type=int, default=4,
+                        help="Tokens the draft model proposes per verification pass")
+    parser.add_argument('--single-turn', action='store_true',
+                        help="Answer each question without the earlier conversation")
+    parser.add_argument('--rag-passages', type=int, default=0,
+                        help="Knowledge base passages to add to each prompt (0 disables)")
+    parser.add_argument('--no-direct-answers', action='store_true',
+                        help="Always generate, even when the knowledge base answers the question")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record time-to-first-token/tokens-per-second metrics and a cProfile of the session")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="Where --profile writes its .prom, .json and .prof files")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    with profiled(args.profile, 'chat', args.profile_dir):
+        chat(args)
+
+def chat(args):
     print("Loading Zombies Bot...")
-    bot = ZombiesBot()
+    bot = ZombiesBot(model_dir=args.model_dir, knowledge_base_path=args.knowledge_base,
+                     rag_passages=args.rag_passages, quantized=args.quantized,
+                     draft_model_dir=args.draft_model_dir, num_draft_tokens=args.draft_tokens)
+    try:
+        bot.check_max_new_tokens(args.max_new_tokens)
+    except ValueError as e:
+        print(f"--max-new-tokens: {e}")
+        return
+    session = ChatSession()
     print("\nZombies Bot initialized! Ask me anything about Call of Duty Black Ops 2 Zombies!")
-    print("Type 'quit' to exit")
+    print("Type 'quit' to exit, 'reset' to start a new conversation")
     
     while True:
         user_input = input("\nYou: ").strip()
         if user_input.lower() in ['quit', 'exit', 'bye']:
+            if bot.speculative:
+                print(f"Speculative decoding: {bot.speculative.acceptance_rate():.0%} of draft tokens accepted, "
+                      f"{bot.speculative.tokens_per_pass():.2f} tokens per model pass")
             print("Goodbye!")
             break
+        if user_input.lower() == 'reset' or args.single_turn:
+            session.reset()
+            if not args.single_turn:
+                continue
         
-        response = bot.generate_response(user_input)
-        print(f"\nBot: {response}")
+        print("\nBot: ", end="", flush=True)
+        answer = None if args.no_direct_answers else bot.answer_from_knowledge_base(user_input)
+        if answer:
+            print(answer)
+            continue
+        prompt = bot.build_prompt(user_input)
+        for piece in bot.stream_response(session, prompt, max_new_tokens=args.max_new_tokens):
+            print(piece, end="", flush=True)
+        print()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,68 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class CrawlStateStore:
+    """Durable record of every crawled page and the data extracted from it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # WAL + a commit per page keeps completed work on disk through crashes and Ctrl-C
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""CREATE TABLE IF NOT EXISTS pages (
+            url TEXT, kind TEXT, name TEXT, source TEXT, status TEXT,
+            record TEXT, error TEXT, updated_at REAL,
+            PRIMARY KEY (url, kind, name))""")
+        self.db.commit()
+
+    def is_done(self, url, kind, name):
+        with self.lock:
+            row = self.db.execute('SELECT status FROM pages WHERE url = ? AND kind = ? AND name = ?',
+                                  (url, kind, name)).fetchone()
+        return bool(row) and row[0] == 'done'
+
+    def get_record(self, url, kind, name):
+        """The record saved for a finished page, or None"""
+        with self.lock:
+            row = self.db.execute("SELECT record FROM pages WHERE url = ? AND kind = ? AND name = ? AND status = 'done'",
+                                  (url, kind, name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_done(self, url, kind, name, source, record):
+        self.save(url, kind, name, source, 'done', json.dumps(record, ensure_ascii=False), None)
+
+    def mark_failed(self, url, kind, name, source, error):
+        self.save(url, kind, name, source, 'failed', None, error)
+
+    def save(self, url, kind, name, source, status, record, error):
+        with self.lock:
+            # REPLACE moves the row to the end, so rowid order is completion order
+            self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            (url, kind, name, source, status, record, error, time.time()))
+            self.db.commit()
+
+    def iter_records(self):
+        """Yield (kind, name, record) for finished pages in completion order"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT kind, name, record FROM pages WHERE status = 'done' ORDER BY rowid").fetchall()
+        for kind, name, record in rows:
+            yield kind, name, json.loads(record)
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute('SELECT status, COUNT(*) FROM pages GROUP BY status').fetchall())
+
+    def reset(self):
+        with self.lock:
+            self.db.execute('DELETE FROM pages')
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -1,78 +1,270 @@
-import requests
 from bs4 import BeautifulSoup
-import json
+import lxml.html
+from lxml import etree
 import re
 import time
-from urllib.parse import urljoin
-import inquirer
-from youtube_transcript_api import YouTubeTranscriptApi
-import pandas as pd
-import nltk
-from nltk.tokenize import sent_tokenize
-from nltk.corpus import stopwords
-import selenium.webdriver as webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from urllib.parse import urljoin, urlparse
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from zombies_fetcher import ZombiesFetcher
+from zombies_cache import ZombiesHTTPCache
+from zombies_crawl_state import CrawlStateStore
+from zombies_frontier import CrawlFrontier
+from zombies_metrics import metrics, profiled
+
+# inquirer, nltk, selenium and youtube_transcript_api are imported where they are
+# used, so runs that never touch a backend don't pay for importing it
+
+# NLTK resources are downloaded here once and reused; copy this directory to offline hosts
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'nltk_data')
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords'
+}
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def ensure_nltk_resource(package, offline=False):
+    """Make an NLTK resource available, downloading it into NLTK_DATA_DIR only if missing"""
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    try:
+        nltk.data.find(NLTK_RESOURCES[package])
+        return True
+    except LookupError:
+        pass
+    if offline:
+        return False
+    os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+    return nltk.download(package, download_dir=NLTK_DATA_DIR, quiet=True)
+
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+')
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s.,!?]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+GAMING_STOPWORDS = frozenset({'click', 'subscribe', 'like', 'comment', 'video', 'watch'})
+RELEVANCE_KEYWORDS = ('zombie', 'map', 'weapon')
+# Texts per task when cleaning is fanned out to worker processes
+CLEAN_CHUNK_SIZE = 256
+# Crawl-state page kind -> collected_data category
+PAGE_CATEGORIES = {'map': 'maps', 'weapon': 'weapons'}
+DATA_TYPES = ['Maps', 'Weapons', 'Perks', 'Characters', 'Easter Eggs']
+
+class KeywordMatcher:
+    """Finds whether any of a set of keywords occurs in a text with one regex scan"""
+    
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        alternatives = sorted(set(self.keywords), key=len, reverse=True)
+        self.pattern = re.compile('|'.join(map(re.escape, alternatives))) if alternatives else None
+    
+    def matches(self, text):
+        return self.pattern is not None and self.pattern.search(text.lower()) is not None
+
+# Set in each cleaning worker process by init_clean_worker
+worker_cleaner = None
+
+def init_clean_worker(offline):
+    global worker_cleaner
+    worker_cleaner = ZombiesDataCleaner(offline=offline)
+
+def run_clean_chunk(method_name, texts, *args):
+    return getattr(worker_cleaner, method_name)(texts, *args)
+
+STATS_TABLE_CLASS = re.compile(r'.*stats.*')
+MAP_LINK_PATTERN = re.compile(r'/wiki/.*map.*')
+MAP_SECTION_FIELDS = [
+    (['location', 'area', 'room'], "locations"),
+    (['weapon', 'armory', 'gun'], "weapons"),
+    (['easter egg', 'secret'], "easter_eggs"),
+    (['strateg', 'guide', 'tip'], "strategies"),
+    (['feature', 'mechanic'], "features"),
+]
+
+@metrics.timed('parse_seconds')
+def parse_content(html):
+    """Parse an article with lxml and return its mw-parser-output element, or None"""
+    if not html or not html.strip():
+        return None
+    matches = lxml.html.fromstring(html).find_class('mw-parser-output')
+    if not matches:
+        return None
+    content = matches[0]
+    # Match BeautifulSoup's get_text(), which skips script and style contents
+    etree.strip_elements(content, 'script', 'style', with_tail=False)
+    return content
+
+def is_map_link(name, href, heading):
+    """Links listed under a "Maps" heading, or whose URL mentions a map"""
+    return bool(heading and 'map' in heading) or bool(MAP_LINK_PATTERN.search(href))
+
+def iter_sections(content):
+    """Yield (lowercased h2/h3 heading or None, element) for each top-level tag"""
+    heading = None
+    for elem in content:
+        if not isinstance(elem.tag, str):
+            continue  # Comments and processing instructions
+        if elem.tag in ['h2', 'h3']:
+            heading = elem.text_content().lower()
+        yield heading, elem
+
+def first_paragraph(elem):
+    return elem if elem.tag == 'p' else elem.find('.//p')
+
+def find_stats_table(elem):
+    for table in elem.iter('table'):
+        if any(STATS_TABLE_CLASS.match(name) for name in table.get('class', '').split()):
+            return table
+    return None
 
 class ZombiesDataCleaner:
-    def __init__(self):
-        nltk.download('punkt')
-        nltk.download('stopwords')
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, offline=False, processes=None):
+        # NLTK is loaded on first use; `offline` never attempts a download
+        self.offline = offline
+        self._stop_words = None
+        self._sent_tokenize = None
+        # Batch methods fan out to this many worker processes when > 1
+        self.processes = processes
+        self._pool = None
+        self._matchers = {}
+    
+    @property
+    def stop_words(self):
+        if self._stop_words is None:
+            if ensure_nltk_resource('stopwords', self.offline):
+                from nltk.corpus import stopwords
+                self._stop_words = set(stopwords.words('english'))
+            else:
+                print("NLTK stopwords unavailable; using an empty stopword list")
+                self._stop_words = set()
+        return self._stop_words
+    
+    def sent_tokenize(self, text):
+        if self._sent_tokenize is None:
+            if ensure_nltk_resource('punkt', self.offline):
+                from nltk.tokenize import sent_tokenize
+                self._sent_tokenize = sent_tokenize
+            else:
+                print("NLTK punkt unavailable; splitting sentences on punctuation")
+                self._sent_tokenize = SENTENCE_END.split
+        return self._sent_tokenize(text)
         
     def clean_text(self, text):
         if not text:
             return ""
             
         # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text)
+        text = URL_PATTERN.sub('', text)
         
         # Remove special characters and extra whitespace
-        text = re.sub(r'[^\w\s.,!?]', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
+        text = SPECIAL_CHARS_PATTERN.sub(' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         
         # Remove gaming-unrelated terms
-        gaming_stopwords = {'click', 'subscribe', 'like', 'comment', 'video', 'watch'}
         words = text.split()
-        words = [w for w in words if w.lower() not in gaming_stopwords]
+        words = [w for w in words if w.lower() not in GAMING_STOPWORDS]
         
         return ' '.join(words).strip()
     
+    def matcher(self, keywords):
+        keywords = tuple(keywords)
+        if keywords not in self._matchers:
+            self._matchers[keywords] = KeywordMatcher(keywords)
+        return self._matchers[keywords]
+    
     def is_relevant(self, text, keywords):
         """Check if text contains relevant keywords"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in keywords)
+        return self.matcher(keywords).matches(text)
     
     def structure_sentences(self, text):
         """Split text into well-formed sentences"""
-        sentences = sent_tokenize(text)
+        sentences = self.sent_tokenize(text)
         return [s.strip() for s in sentences if len(s.strip()) > 20]
+    
+    @metrics.timed('clean_seconds', step='clean')
+    def clean_many(self, texts):
+        """clean_text for each text, in order"""
+        return self.map_chunks('clean_chunk', texts)
+    
+    def filter_relevant_many(self, texts, keywords):
+        """Keep the texts that contain any of `keywords`"""
+        matcher = self.matcher(keywords)
+        return [text for text in texts if matcher.matches(text)]
+    
+    @metrics.timed('clean_seconds', step='sentences')
+    def sentences_many(self, texts):
+        """structure_sentences for each text, in order"""
+        return self.map_chunks('sentences_chunk', texts)
+    
+    @metrics.timed('clean_seconds', step='clean_and_split')
+    def clean_and_split_many(self, texts, keywords):
+        """Clean each text and split relevant ones into sentences; others give []"""
+        return self.map_chunks('clean_and_split_chunk', texts, tuple(keywords))
+    
+    def clean_chunk(self, texts):
+        return [self.clean_text(text) for text in texts]
+    
+    def sentences_chunk(self, texts):
+        return [self.structure_sentences(text) for text in texts]
+    
+    def clean_and_split_chunk(self, texts, keywords):
+        matcher = self.matcher(keywords)
+        results = []
+        for text in texts:
+            cleaned_text = self.clean_text(text)
+            if cleaned_text and matcher.matches(cleaned_text):
+                results.append(self.structure_sentences(cleaned_text))
+            else:
+                results.append([])
+        return results
+    
+    def map_chunks(self, method_name, texts, *args):
+        texts = list(texts)
+        if not self.processes or self.processes <= 1 or len(texts) <= CLEAN_CHUNK_SIZE:
+            return getattr(self, method_name)(texts, *args)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                             initializer=init_clean_worker,
+                                             initargs=(self.offline,))
+        chunks = [texts[i:i + CLEAN_CHUNK_SIZE] for i in range(0, len(texts), CLEAN_CHUNK_SIZE)]
+        futures = [self._pool.submit(run_clean_chunk, method_name, chunk, *args) for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+    
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
 class ZombiesDataCollector:
-    def __init__(self):
-        self.cleaner = ZombiesDataCleaner()
+    def __init__(self, max_workers=8, requests_per_second=1.0, host_rates=None,
+                 cache_mode='default', cache_max_bytes=512 * 1024 * 1024, resume=False,
+                 clean_processes=None, dedup_threshold=0.8, data_dir=None, state_path=None):
+        self.cleaner = ZombiesDataCleaner(offline=cache_mode == 'cache-only',
+                                          processes=clean_processes)
+        # Estimated Jaccard similarity above which a sentence counts as a repeat; None disables
+        self.dedup_threshold = dedup_threshold
         self.sources = {
             "Nazi Zombies Wiki": {
                 "base_url": "https://nazizombies.fandom.com",
                 "maps_path": "/wiki/Call_of_Duty:_Black_Ops_II#Zombies",
                 "weapons_path": "/wiki/Category:Call_of_Duty:_Black_Ops_II_Zombies_Weapons",
-                "perks_path": "/wiki/Category:Call_of_Duty:_Black_Ops_II_Perks"
+                "perks_path": "/wiki/Category:Call_of_Duty:_Black_Ops_II_Perks",
+                "cache_ttl": 7 * 24 * 3600
             },
             "COD Fandom": {
                 "base_url": "https://callofduty.fandom.com",
                 "maps_path": "/wiki/Call_of_Duty:_Black_Ops_II_Zombies",
                 "weapons_path": "/wiki/Category:Call_of_Duty:_Black_Ops_II_Weapons",
-                "perks_path": "/wiki/Perk-a-Cola"
+                "perks_path": "/wiki/Perk-a-Cola",
+                "cache_ttl": 7 * 24 * 3600
             },
             "Game Guides": {
                 "urls": [
                     "https://www.ign.com/wikis/call-of-duty-black-ops-2/Zombies",
                     "https://www.gamesradar.com/call-of-duty-black-ops-2-zombies-guide/",
                     # Add more guide URLs
-                ]
+                ],
+                "cache_ttl": 30 * 24 * 3600
             },
             "YouTube Guides": {
                 "video_ids": [
@@ -81,8 +273,14 @@ class ZombiesDataCollector:
                 ]
             },
             "Reddit Discussions": {
+                # Point base_url at a stand-in server to test collection offline
+                "base_url": "https://www.reddit.com",
                 "subreddits": ["CODZombies", "blackops2"],
-                "search_terms": ["Black Ops 2", "BO2 zombies", "Black Ops II zombies"]
+                "search_terms": ["Black Ops 2", "BO2 zombies", "Black Ops II zombies"],
+                "max_pages": 10,            # Search result pages (100 posts each) per query
+                "comments": True,
+                "browser_pool_size": 2,     # Headless browsers used if JSON requests are blocked; 0 disables
+                "cache_ttl": 6 * 3600
             }
         }
         
@@ -95,48 +293,143 @@ class ZombiesDataCollector:
             "gameplay_mechanics": {}
         }
         
-        # Create data directory if it doesn't exist
-        self.data_dir = os.path.join(os.path.dirname(__file__), 'data')
+        # Create data directory if it doesn't exist; cache, crawl state and datasets all live here
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'data')
         os.makedirs(self.data_dir, exist_ok=True)
         
-    def get_soup(self, url, retry_count=3):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+        # Responses are cached under data/http_cache and revalidated with ETag/Last-Modified
+        cache = None
+        if cache_mode != 'off':
+            cache = ZombiesHTTPCache(os.path.join(self.data_dir, 'http_cache'),
+                                     max_bytes=cache_max_bytes,
+                                     host_ttls=self.cache_host_ttls())
+        # Shared keep-alive session; politeness is a per-host token bucket
+        self.fetcher = ZombiesFetcher(max_workers=max_workers,
+                                      requests_per_second=requests_per_second,
+                                      host_rates=host_rates,
+                                      cache=cache,
+                                      cache_mode=cache_mode)
+        
+        # Every finished page is committed to data/crawl_state.sqlite as it completes
+        self.state = CrawlStateStore(state_path or os.path.join(self.data_dir, 'crawl_state.sqlite'))
+        # Finished pages are restored into collected_data when a batch run starts;
+        # streamed runs replay them from the store page by page instead
+        self.resume = resume
+        if not resume:
+            self.state.reset()
+        
+        # Article links discovered this run, each fetched once across all sources
+        self.frontier = CrawlFrontier()
+        
+        # What a per-source worker process needs to build a collector like this one
+        self.worker_settings = {
+            "max_workers": max_workers,
+            "requests_per_second": requests_per_second,
+            "host_rates": host_rates,
+            "cache_mode": cache_mode,
+            "cache_max_bytes": cache_max_bytes,
+            "resume": resume,
+            "clean_processes": clean_processes,
+            "data_dir": self.data_dir
         }
         
-        for attempt in range(retry_count):
-            try:
-                time.sleep(1)  # Be nice to servers
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                return BeautifulSoup(response.text, 'html.parser')
-            except Exception as e:
-                print(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
-                if attempt == retry_count - 1:
-                    print(f"Failed to fetch {url} after {retry_count} attempts")
-                    return None
-                time.sleep(2 ** attempt)  # Exponential backoff
+    def cache_host_ttls(self):
+        """Map each source's hosts to that source's cache TTL"""
+        host_ttls = {}
+        for source in self.sources.values():
+            if 'cache_ttl' not in source:
+                continue
+            urls = source.get('urls', []) + ([source['base_url']] if 'base_url' in source else [])
+            for url in urls:
+                host_ttls[urlparse(url).netloc.lower()] = source['cache_ttl']
+        return host_ttls
+
+    def restore_collected_data(self):
+        """Rebuild collected_data from the pages finished by a previous run"""
+        restored = 0
+        for kind, name, record in self.state.iter_records():
+            if kind == 'map':
+                self.add_map_data(name, record)
+            elif kind == 'weapon':
+                self.add_weapon_data(name, record)
+            restored += 1
+        print(f"Resuming crawl: restored {restored} finished pages")
+
+    def get_soup(self, url, retry_count=3):
+        result = self.fetcher.fetch(url, retry_count)
+        if not result:
+            return None
+        return BeautifulSoup(result.text, 'lxml')
+
+    def get_articles(self, links, retry_count=3):
+        """Fetch (name, url) links concurrently, yielding (name, url, content element or None) in link order.
+
+        A page that redirects to an article already fetched this run is left out.
+        """
+        results = self.fetcher.fetch_many([url for _, url in links], retry_count)
+        for (name, url), (_, result) in zip(links, results):
+            if result and not self.frontier.claim(url, result.final_url, result.text):
+                print(f"Skipping {name}: {url} redirects to an article already collected")
+                continue
+            yield name, url, parse_content(result.text) if result else None
     
     def ask_sources(self):
+        import inquirer
+        
         questions = [
             inquirer.Checkbox('sources',
                 message="Which sources would you like to scrape?",
                 choices=list(self.sources.keys())),
             inquirer.Checkbox('data_types',
                 message="What type of data would you like to collect?",
-                choices=['Maps', 'Weapons', 'Perks', 'Characters', 'Easter Eggs']),
+                choices=DATA_TYPES),
         ]
         
         answers = inquirer.prompt(questions)
         return answers
 
+    def find_map_links(self, base_url, maps_path):
+        """(map name, url) for every map article linked from the maps page and not queued before"""
+        page_url = urljoin(base_url, maps_path)
+        soup = self.get_soup(page_url)
+        if not soup:
+            return []
+        return self.frontier.discover(soup, page_url, link_filter=is_map_link)
+
+    def collect_maps_data(self, source_name, base_url, maps_path):
+        print(f"\nCollecting maps data from {source_name}")
+        map_links = self.find_map_links(base_url, maps_path)
+        
+        # Pages finished by a previous run are not fetched again
+        map_links = [(map_name, map_url) for map_name, map_url in map_links
+                     if not self.state.is_done(map_url, 'map', map_name)]
+        for map_name, map_url, content in self.get_articles(map_links):
+            print(f"\nCollecting data for map: {map_name} from {source_name}")
+            if content is None:
+                self.state.mark_failed(map_url, 'map', map_name, source_name, "fetch failed")
+                continue
+            map_data = self.extract_map_data(source_name, content)
+            self.state.mark_done(map_url, 'map', map_name, source_name, map_data)
+            self.add_map_data(map_name, map_data)
+
     def collect_map_data(self, source_name, map_url, map_name):
         print(f"\nCollecting data for map: {map_name} from {source_name}")
-        soup = self.get_soup(map_url)
-        if not soup:
+        if self.state.is_done(map_url, 'map', map_name):
             return
-            
+        articles = list(self.get_articles([(map_name, map_url)]))
+        if not articles:
+            return
+        _, _, content = articles[0]
+        if content is None:
+            self.state.mark_failed(map_url, 'map', map_name, source_name, "fetch failed")
+            return
+        map_data = self.extract_map_data(source_name, content)
+        self.state.mark_done(map_url, 'map', map_name, source_name, map_data)
+        self.add_map_data(map_name, map_data)
+
+    @metrics.timed('extract_seconds', kind='map')
+    def extract_map_data(self, source_name, content):
+        """Fill every map field in a single walk over the article's sections"""
         map_data = {
             "description": "",
             "features": [],
@@ -147,36 +440,28 @@ class ZombiesDataCollector:
             "source": source_name
         }
         
-        # Get main content
-        content = soup.find('div', {'class': 'mw-parser-output'})
-        if content:
-            # Get description
-            first_p = content.find('p')
-            if first_p:
-                map_data["description"] = first_p.get_text().strip()
-            
-            # Get sections
-            sections = content.find_all(['h2', 'h3'])
-            for section in sections:
-                section_title = section.get_text().lower()
-                next_elem = section.find_next_sibling()
-                
-                while next_elem and next_elem.name not in ['h2', 'h3']:
-                    if next_elem.name in ['p', 'ul', 'li']:
-                        text = next_elem.get_text().strip()
-                        if text:
-                            if any(keyword in section_title for keyword in ['location', 'area', 'room']):
-                                map_data["locations"].append(text)
-                            elif any(keyword in section_title for keyword in ['weapon', 'armory', 'gun']):
-                                map_data["weapons"].append(text)
-                            elif any(keyword in section_title for keyword in ['easter egg', 'secret']):
-                                map_data["easter_eggs"].append(text)
-                            elif any(keyword in section_title for keyword in ['strateg', 'guide', 'tip']):
-                                map_data["strategies"].append(text)
-                            elif any(keyword in section_title for keyword in ['feature', 'mechanic']):
-                                map_data["features"].append(text)
-                    next_elem = next_elem.find_next_sibling()
+        if content is None:
+            return map_data
         
+        field = None
+        for heading, elem in iter_sections(content):
+            if elem.tag in ['h2', 'h3']:
+                # Classify each section once, by its title
+                field = next((name for keywords, name in MAP_SECTION_FIELDS
+                              if any(keyword in heading for keyword in keywords)), None)
+                continue
+            if not map_data["description"]:
+                first_p = first_paragraph(elem)
+                if first_p is not None:
+                    map_data["description"] = first_p.text_content().strip()
+            if field and elem.tag in ['p', 'ul', 'li']:
+                text = elem.text_content().strip()
+                if text:
+                    map_data[field].append(text)
+        
+        return map_data
+
+    def add_map_data(self, map_name, map_data):
         if map_name not in self.collected_data["maps"]:
             self.collected_data["maps"][map_name] = map_data
         else:
@@ -187,76 +472,94 @@ class ZombiesDataCollector:
                 elif not self.collected_data["maps"][map_name][key]:
                     self.collected_data["maps"][map_name][key] = value
 
+    def find_weapon_links(self, base_url, weapons_path):
+        """(weapon name, url) for every article listed on the weapons category page and not queued before"""
+        page_url = urljoin(base_url, weapons_path)
+        soup = self.get_soup(page_url)
+        if not soup:
+            return []
+        return self.frontier.discover(soup, page_url, min_name_length=3)
+
     def collect_weapons_data(self, source_name, base_url, weapons_path):
         print(f"\nCollecting weapons data from {source_name}")
-        weapons_url = urljoin(base_url, weapons_path)
-        soup = self.get_soup(weapons_url)
-        if not soup:
-            return
+        weapon_links = self.find_weapon_links(base_url, weapons_path)
         
-        weapon_links = soup.find_all('a', href=re.compile(r'/wiki/.*'))
-        for link in weapon_links:
-            weapon_url = urljoin(base_url, link['href'])
-            weapon_name = link.get_text().strip()
-            
-            if not weapon_name or len(weapon_name) < 3:
-                continue
-                
+        # Pages are fetched concurrently but processed in link order;
+        # pages finished by a previous run are not fetched again
+        weapon_links = [(weapon_name, weapon_url) for weapon_name, weapon_url in weapon_links
+                        if not self.state.is_done(weapon_url, 'weapon', weapon_name)]
+        for weapon_name, weapon_url, content in self.get_articles(weapon_links):
             print(f"Processing weapon: {weapon_name}")
-            weapon_soup = self.get_soup(weapon_url)
-            if not weapon_soup:
+            if content is None:
+                self.state.mark_failed(weapon_url, 'weapon', weapon_name, source_name, "fetch failed")
                 continue
                 
-            weapon_data = {
-                "stats": self.extract_weapon_stats(weapon_soup),
-                "description": self.extract_weapon_description(weapon_soup),
-                "pack_a_punch": self.extract_pack_a_punch(weapon_soup),
-                "locations": self.extract_weapon_locations(weapon_soup),
-                "source": source_name
-            }
+            weapon_data = self.extract_weapon_data(source_name, content)
+            self.state.mark_done(weapon_url, 'weapon', weapon_name, source_name, weapon_data)
+            self.add_weapon_data(weapon_name, weapon_data)
+
+    def add_weapon_data(self, weapon_name, weapon_data):
+        if weapon_name not in self.collected_data["weapons"]:
+            self.collected_data["weapons"][weapon_name] = weapon_data
+        else:
+            # Merge data from multiple sources
+            self.merge_weapon_data(weapon_name, weapon_data)
+
+    @metrics.timed('extract_seconds', kind='weapon')
+    def extract_weapon_data(self, source_name, content):
+        """Fill every weapon field in a single walk over the article's sections"""
+        weapon_data = {
+            "stats": {},
+            "description": "",
+            "pack_a_punch": "",
+            "locations": [],
+            "source": source_name
+        }
+        if content is None:
+            return weapon_data
+        
+        stats_table = None
+        pap_state = None       # None -> 'next' (heading seen) -> 'done'
+        locations_state = None  # None -> 'collecting' -> 'done'
+        for heading, elem in iter_sections(content):
+            if elem.tag in ['h2', 'h3']:
+                # A heading ends the section the previous heading opened
+                if pap_state == 'next':
+                    pap_state = 'done'
+                if locations_state == 'collecting':
+                    locations_state = 'done'
+                if pap_state is None and 'pack-a-punch' in heading:
+                    pap_state = 'next'
+                if locations_state is None and 'location' in heading:
+                    locations_state = 'collecting'
+                continue
             
-            if weapon_name not in self.collected_data["weapons"]:
-                self.collected_data["weapons"][weapon_name] = weapon_data
-            else:
-                # Merge data from multiple sources
-                self.merge_weapon_data(weapon_name, weapon_data)
-
-    def extract_weapon_stats(self, soup):
-        stats = {}
-        stats_table = soup.find('table', {'class': re.compile(r'.*stats.*')})
-        if stats_table:
-            rows = stats_table.find_all('tr')
-            for row in rows:
-                cols = row.find_all(['th', 'td'])
-                if len(cols) >= 2:
-                    stat_name = cols[0].get_text().strip()
-                    stat_value = cols[1].get_text().strip()
-                    stats[stat_name] = stat_value
-        return stats
-
-    def extract_weapon_description(self, soup):
-        first_p = soup.find('p')
-        return first_p.get_text().strip() if first_p else ""
-
-    def extract_pack_a_punch(self, soup):
-        pap_section = soup.find(lambda tag: tag.name in ['h2', 'h3'] and 
-                              'pack-a-punch' in tag.get_text().lower())
-        if pap_section:
-            next_elem = pap_section.find_next_sibling()
-            if next_elem and next_elem.name == 'p':
-                return next_elem.get_text().strip()
-        return ""
-
-    def extract_weapon_locations(self, soup):
-        locations = []
-        location_section = soup.find(lambda tag: tag.name in ['h2', 'h3'] and 
-                                   'location' in tag.get_text().lower())
-        if location_section:
-            next_elem = location_section.find_next_sibling()
-            while next_elem and next_elem.name in ['p', 'ul', 'li']:
-                locations.append(next_elem.get_text().strip())
-                next_elem = next_elem.find_next_sibling()
-        return locations
+            if pap_state == 'next':
+                # Only the paragraph directly after the heading counts
+                if elem.tag == 'p':
+                    weapon_data["pack_a_punch"] = elem.text_content().strip()
+                pap_state = 'done'
+            
+            if locations_state == 'collecting':
+                if elem.tag in ['p', 'ul', 'li']:
+                    weapon_data["locations"].append(elem.text_content().strip())
+                else:
+                    locations_state = 'done'
+            
+            if not weapon_data["description"]:
+                first_p = first_paragraph(elem)
+                if first_p is not None:
+                    weapon_data["description"] = first_p.text_content().strip()
+            
+            if stats_table is None:
+                stats_table = find_stats_table(elem)
+                if stats_table is not None:
+                    for row in stats_table.iter('tr'):
+                        cols = list(row.iter('th', 'td'))
+                        if len(cols) >= 2:
+                            weapon_data["stats"][cols[0].text_content().strip()] = cols[1].text_content().strip()
+        
+        return weapon_data
 
     def merge_weapon_data(self, weapon_name, new_data):
         current_data = self.collected_data["weapons"][weapon_name]
@@ -270,6 +573,7 @@ class ZombiesDataCollector:
 
     def collect_youtube_data(self):
         print("\nCollecting YouTube transcripts...")
+        from youtube_transcript_api import YouTubeTranscriptApi
         youtube_data = []
         
         for video_id in self.sources["YouTube Guides"]["video_ids"]:
@@ -279,7 +583,7 @@ class ZombiesDataCollector:
                 
                 # Clean and structure the transcript
                 cleaned_text = self.cleaner.clean_text(full_text)
-                if self.cleaner.is_relevant(cleaned_text, ['zombie', 'map', 'weapon']):
+                if self.cleaner.is_relevant(cleaned_text, RELEVANCE_KEYWORDS):
                     sentences = self.cleaner.structure_sentences(cleaned_text)
                     youtube_data.extend(sentences)
                     
@@ -290,45 +594,26 @@ class ZombiesDataCollector:
 
     def collect_reddit_data(self):
         print("\nCollecting Reddit discussions...")
-        reddit_data = []
-        
-        # Initialize Selenium
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        driver = webdriver.Chrome(options=chrome_options)
+        from zombies_reddit import RedditClient
         
+        config = self.sources["Reddit Discussions"]
+        client = RedditClient(self.fetcher, config["base_url"],
+                              max_pages=config.get("max_pages", 10),
+                              browser_pool_size=config.get("browser_pool_size", 2))
         try:
-            for subreddit in self.sources["Reddit Discussions"]["subreddits"]:
-                for search_term in self.sources["Reddit Discussions"]["search_terms"]:
-                    url = f"https://www.reddit.com/r/{subreddit}/search/?q={search_term}&restrict_sr=1"
-                    driver.get(url)
-                    
-                    # Wait for posts to load
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "Post"))
-                    )
-                    
-                    # Get post content
-                    posts = driver.find_elements(By.CLASS_NAME, "Post")
-                    for post in posts:
-                        try:
-                            title = post.find_element(By.CLASS_NAME, "title").text
-                            content = post.find_element(By.CLASS_NAME, "content").text
-                            
-                            combined_text = f"{title} {content}"
-                            cleaned_text = self.cleaner.clean_text(combined_text)
-                            
-                            if self.cleaner.is_relevant(cleaned_text, ['zombie', 'map', 'weapon']):
-                                sentences = self.cleaner.structure_sentences(cleaned_text)
-                                reddit_data.extend(sentences)
-                                
-                        except Exception as e:
-                            continue
-                            
+            posts, comments = client.collect(config["subreddits"], config["search_terms"],
+                                             with_comments=config.get("comments", True))
         finally:
-            driver.quit()
+            client.close()
+        print(f"Reddit: {len(posts)} posts and {len(comments)} comments "
+              f"({client.stats['duplicate_posts']} duplicate posts and "
+              f"{client.stats['duplicate_comments']} duplicate comments skipped)")
         
-        return reddit_data
+        # Clean and structure the texts in one batch
+        texts = [f"{post['title']} {post['selftext']}" for post in posts]
+        texts += [comment['body'] for comment in comments]
+        sentence_lists = self.cleaner.clean_and_split_many(texts, RELEVANCE_KEYWORDS)
+        return [sentence for sentences in sentence_lists for sentence in sentences]
 
     def collect_guide_data(self):
         print("\nCollecting game guides...")
@@ -346,7 +631,7 @@ class ZombiesDataCollector:
                     text = content.get_text()
                     cleaned_text = self.cleaner.clean_text(text)
                     
-                    if self.cleaner.is_relevant(cleaned_text, ['zombie', 'map', 'weapon']):
+                    if self.cleaner.is_relevant(cleaned_text, RELEVANCE_KEYWORDS):
                         sentences = self.cleaner.structure_sentences(cleaned_text)
                         guide_data.extend(sentences)
                         
@@ -358,116 +643,419 @@ class ZombiesDataCollector:
     def save_data(self):
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         
-        # Clean and structure all collected data
+        # Clean and structure all collected data, batched across every record
+        string_fields = []
+        list_fields = []
+        list_texts = []
         for category in self.collected_data:
             for item_name, item_data in self.collected_data[category].items():
                 if isinstance(item_data, dict):
                     for key, value in item_data.items():
                         if isinstance(value, str):
-                            item_data[key] = self.cleaner.clean_text(value)
+                            string_fields.append((item_data, key))
                         elif isinstance(value, list):
-                            cleaned_list = []
-                            for text in value:
-                                cleaned_text = self.cleaner.clean_text(text)
-                                if cleaned_text and self.cleaner.is_relevant(cleaned_text, ['zombie', 'map', 'weapon']):
-                                    cleaned_list.extend(self.cleaner.structure_sentences(cleaned_text))
-                            item_data[key] = cleaned_list
-        
-        # Save structured data
-        structured_filename = os.path.join(self.data_dir, f'zombies_dataset_structured_{timestamp}.json')
-        with open(structured_filename, 'w', encoding='utf-8') as f:
-            json.dump(self.collected_data, f, ensure_ascii=False, indent=2)
+                            list_fields.append((item_data, key, len(value)))
+                            list_texts.extend(value)
+        
+        cleaned_strings = self.cleaner.clean_many([item_data[key] for item_data, key in string_fields])
+        for (item_data, key), cleaned_text in zip(string_fields, cleaned_strings):
+            item_data[key] = cleaned_text
+        
+        sentence_lists = self.cleaner.clean_and_split_many(list_texts, RELEVANCE_KEYWORDS)
+        offset = 0
+        for item_data, key, count in list_fields:
+            item_data[key] = [s for sentences in sentence_lists[offset:offset + count] for s in sentences]
+            offset += count
+        
+        if self.dedup_threshold is not None:
+            # Sources that mirror each other repeat the same sentences; keep the first copy
+            from zombies_dedup import SentenceDeduplicator, dedup_collected_data
+            with metrics.timer('clean_seconds', step='dedup'):
+                stats = dedup_collected_data(self.collected_data, SentenceDeduplicator(self.dedup_threshold))
+            print(f"\nDeduplication: removed {stats['exact']} exact and {stats['near']} "
+                  f"near-duplicate sentences out of {stats['checked']}")
         
         # Create enhanced training data
         training_data = self.create_training_data()
         
-        # Save training data
-        training_filename = os.path.join(self.data_dir, f'zombies_dataset_training_{timestamp}.json')
-        with open(training_filename, 'w', encoding='utf-8') as f:
-            json.dump(training_data, f, ensure_ascii=False, indent=2)
+        # Save structured and training data as JSONL shards; the manifest marks this run as the latest
+        from zombies_dataset import write_dataset
+        dataset_dir = write_dataset(self.collected_data, training_data,
+                                    root=os.path.join(self.data_dir, 'datasets'), timestamp=timestamp)
+        
+        # Prebuilt retrieval index, so ZombiesBot can memory-map it instead of parsing the dataset
+        from zombies_index import build_index_file
+        index_dir = build_index_file(dataset_dir)
             
         print(f"\nData saved to:")
-        print(f"- {structured_filename}")
-        print(f"- {training_filename}")
+        print(f"- {dataset_dir}")
+        print(f"- {index_dir}")
 
     def create_training_data(self):
         """Create well-structured training examples"""
         training_data = []
+        for category in ('maps', 'weapons'):
+            for name, record in self.collected_data[category].items():
+                training_data.extend(self.training_examples(category, name, record))
+        return training_data
+
+    def training_examples(self, category, name, record):
+        """Question/answer pairs for one map or weapon record"""
+        examples = []
         
         # Create map-specific examples
-        for map_name, map_data in self.collected_data["maps"].items():
+        if category == 'maps':
             # Basic information
-            training_data.append({
-                "question": f"What is {map_name}?",
-                "answer": map_data["description"]
+            examples.append({
+                "question": f"What is {name}?",
+                "answer": record["description"]
             })
             
             # Features and locations
-            if map_data["features"]:
-                training_data.append({
-                    "question": f"What are the features of {map_name}?",
-                    "answer": ". ".join(map_data["features"])
+            if record["features"]:
+                examples.append({
+                    "question": f"What are the features of {name}?",
+                    "answer": ". ".join(record["features"])
                 })
             
-            if map_data["locations"]:
-                training_data.append({
-                    "question": f"What are the locations in {map_name}?",
-                    "answer": ". ".join(map_data["locations"])
+            if record["locations"]:
+                examples.append({
+                    "question": f"What are the locations in {name}?",
+                    "answer": ". ".join(record["locations"])
                 })
             
             # Easter eggs
-            if map_data["easter_eggs"]:
-                training_data.append({
-                    "question": f"What easter eggs are in {map_name}?",
-                    "answer": ". ".join(map_data["easter_eggs"])
+            if record["easter_eggs"]:
+                examples.append({
+                    "question": f"What easter eggs are in {name}?",
+                    "answer": ". ".join(record["easter_eggs"])
                 })
         
         # Create weapon-specific examples
-        for weapon_name, weapon_data in self.collected_data["weapons"].items():
-            training_data.append({
-                "question": f"Tell me about the {weapon_name}",
-                "answer": weapon_data["description"]
+        elif category == 'weapons':
+            examples.append({
+                "question": f"Tell me about the {name}",
+                "answer": record["description"]
             })
             
-            if weapon_data["stats"]:
-                training_data.append({
-                    "question": f"What are the stats for {weapon_name}?",
-                    "answer": ". ".join([f"{k}: {v}" for k, v in weapon_data["stats"].items()])
+            if record["stats"]:
+                examples.append({
+                    "question": f"What are the stats for {name}?",
+                    "answer": ". ".join([f"{k}: {v}" for k, v in record["stats"].items()])
                 })
         
-        return training_data
+        return examples
 
-    def collect_all_data(self):
-        # Ask user for sources and data types
-        answers = self.ask_sources()
-        
-        if not answers or not answers['sources']:
-            print("No sources selected. Exiting...")
-            return
-            
+    def iter_pages(self, answers):
+        """Yield a page dict for every map/weapon article of the selected sources.
+
+        Pages finished by a previous run carry their saved record, so they skip fetching.
+        """
+        page_types = [('Maps', 'map', self.find_map_links, 'maps_path'),
+                      ('Weapons', 'weapon', self.find_weapon_links, 'weapons_path')]
         for source_name in answers['sources']:
             source = self.sources[source_name]
-            print(f"\nCollecting data from {source_name}...")
-            
-            if 'Maps' in answers['data_types']:
-                # Collect map data
-                main_url = urljoin(source['base_url'], source['maps_path'])
-                soup = self.get_soup(main_url)
-                if soup:
-                    map_links = soup.find_all('a', href=re.compile(r'/wiki/.*map.*'))
-                    for link in map_links:
-                        map_url = urljoin(source['base_url'], link['href'])
-                        map_name = link.get_text().strip()
-                        self.collect_map_data(source_name, map_url, map_name)
+            for data_type, kind, find_links, path_key in page_types:
+                if data_type not in answers['data_types'] or path_key not in source:
+                    continue
+                print(f"\nStreaming {data_type.lower()} from {source_name}")
+                for name, url in find_links(source['base_url'], source[path_key]):
+                    yield {"source": source_name, "kind": kind, "name": name, "url": url,
+                           "record": self.state.get_record(url, kind, name)}
+
+    def fetch_page(self, page):
+        if page["record"] is None:
+            result = self.fetcher.fetch(page["url"])
+            if not result:
+                self.state.mark_failed(page["url"], page["kind"], page["name"], page["source"], "fetch failed")
+                return
+            page["html"], page["final_url"] = result.text, result.final_url
+        yield page
+
+    def extract_page(self, page):
+        if page["record"] is None:
+            # Claimed here rather than in the fetch workers, so pages are claimed in link order
+            if not self.frontier.claim(page["url"], page["final_url"], page["html"]):
+                print(f"Skipping {page['name']}: {page['url']} redirects to an article already collected")
+                return
+            extract = self.extract_map_data if page["kind"] == 'map' else self.extract_weapon_data
+            page["record"] = extract(page["source"], parse_content(page.pop("html")))
+            self.state.mark_done(page["url"], page["kind"], page["name"], page["source"], page["record"])
+        yield page
+
+    def clean_page(self, page):
+        record = page["record"]
+        keys = [key for key, value in record.items() if isinstance(value, str)]
+        for key, cleaned_text in zip(keys, self.cleaner.clean_many([record[key] for key in keys])):
+            record[key] = cleaned_text
+        yield page
+
+    def split_page(self, page):
+        record = page["record"]
+        keys = [key for key, value in record.items() if isinstance(value, list)]
+        sentence_lists = iter(self.cleaner.clean_and_split_many(
+            [text for key in keys for text in record[key]], RELEVANCE_KEYWORDS))
+        for key in keys:
+            record[key] = [s for _ in record[key] for s in next(sentence_lists)]
+        yield page
+
+    def dedup_page(self, page, deduplicator):
+        record = page["record"]
+        for key, value in record.items():
+            if isinstance(value, list) and all(isinstance(text, str) for text in value):
+                record[key] = deduplicator.dedup(value)
+        yield page
+
+    def emit_records(self, page, seen_examples):
+        """(table, row) pairs for one page: its training examples, then its structured row"""
+        category = PAGE_CATEGORIES[page["kind"]]
+        for example in self.training_examples(category, page["name"], page["record"]):
+            # Mirrored pages give the same question/answer pairs; only hashes are kept
+            key = hash((example["question"], example["answer"]))
+            if key in seen_examples:
+                continue
+            seen_examples.add(key)
+            yield 'training', example
+        yield f'structured/{category}', {"category": category, "name": page["name"], "record": page["record"]}
+
+    def stream_data(self, answers, queue_size=16, report_every=30):
+        """Crawl, clean and write records one page at a time instead of holding the whole crawl.
+
+        Each page is written to the dataset as soon as it has been through every
+        stage, so memory stays flat however many pages there are. Pages are not
+        merged across sources: a name found on two wikis gets one structured row
+        per page, which load_structured() and the index merge when read.
+        """
+        from zombies_dataset import DatasetWriter
+        from zombies_pipeline import Pipeline, Stage
+        
+        stages = [
+            Stage('fetch', self.fetch_page, workers=self.fetcher.max_workers),
+            Stage('extract', self.extract_page),
+            Stage('clean', self.clean_page),
+            Stage('split', self.split_page),
+        ]
+        deduplicator = None
+        if self.dedup_threshold is not None:
+            from zombies_dedup import SentenceDeduplicator
+            deduplicator = SentenceDeduplicator(self.dedup_threshold)
+            stages.append(Stage('dedup', lambda page: self.dedup_page(page, deduplicator)))
+        seen_examples = set()
+        stages.append(Stage('emit', lambda page: self.emit_records(page, seen_examples)))
+        
+        writer = DatasetWriter(os.path.join(self.data_dir, 'datasets'))
+        tables = {}
+        pipeline = Pipeline(self.iter_pages(answers), stages, queue_size=queue_size, report_every=report_every)
+        for table, row in pipeline.run():
+            if table not in tables:
+                tables[table] = writer.open_table(table)
+            tables[table].write(row)
+            if table.startswith('structured/'):
+                # A page's structured row comes last, so its rows are all on disk after this
+                for table_writer in tables.values():
+                    table_writer.flush()
+        print(pipeline.format_stats())
+        if deduplicator:
+            stats = deduplicator.stats
+            print(f"\nDeduplication: removed {stats['exact']} exact and {stats['near']} "
+                  f"near-duplicate sentences out of {stats['checked']}")
+        
+        dataset_dir = writer.commit()
+        from zombies_index import build_index_file
+        index_dir = build_index_file(dataset_dir)
+        
+        print(f"\nData saved to:")
+        print(f"- {dataset_dir}")
+        print(f"- {index_dir}")
+
+    def collect_source(self, source_name, data_types):
+        """Collect one source into collected_data: map and weapon articles from the
+        wikis, relevant sentences from the guides, videos and discussions"""
+        source = self.sources[source_name]
+        print(f"\nCollecting data from {source_name}...")
+        
+        if 'base_url' in source and 'maps_path' in source:
+            if 'Maps' in data_types:
+                self.collect_maps_data(source_name, source['base_url'], source['maps_path'])
             
-            if 'Weapons' in answers['data_types']:
+            if 'Weapons' in data_types:
                 self.collect_weapons_data(source_name, source['base_url'], source['weapons_path'])
             
             # Add similar collection methods for other data types...
+            return
+        
+        text_collectors = {
+            "Game Guides": self.collect_guide_data,
+            "YouTube Guides": self.collect_youtube_data,
+            "Reddit Discussions": self.collect_reddit_data
+        }
+        if source_name in text_collectors:
+            self.add_text_data(source_name, text_collectors[source_name]())
+
+    def add_text_data(self, source_name, sentences):
+        """Keep the sentences of a guide, video or discussion source as one gameplay record"""
+        if sentences:
+            self.collected_data["gameplay_mechanics"][source_name] = {
+                "text": sentences,
+                "source": source_name
+            }
+
+    def merge_collected_data(self, collected_data):
+        """Merge another collector's collected_data into this one, the way sources are merged"""
+        from zombies_dataset import merge_record
+        for category, records in collected_data.items():
+            for name, record in records.items():
+                if category == 'maps':
+                    self.add_map_data(name, record)
+                elif category == 'weapons':
+                    self.add_weapon_data(name, record)
+                elif name in self.collected_data[category]:
+                    merge_record(self.collected_data[category][name], record)
+                else:
+                    self.collected_data[category][name] = record
+
+    def collect_sources(self, answers):
+        for source_name in answers['sources']:
+            self.collect_source(source_name, answers['data_types'])
+
+    def collect_all_data(self, stream=False, queue_size=16, answers=None, parallel=False, source_processes=None):
+        """Collect the selected sources and save the dataset.
+
+        `answers` ({"sources": [...], "data_types": [...]}) skips the interactive
+        prompt. With `parallel`, each source is collected in its own process and
+        the results are merged in source order once they have all finished.
+        Returns the names of the sources that failed.
+        """
+        # Ask user for sources and data types
+        if answers is None:
+            answers = self.ask_sources()
+        
+        if not answers or not answers['sources']:
+            print("No sources selected. Exiting...")
+            return []
+            
+        failed = []
+        try:
+            if stream:
+                # Records are written page by page as they come out of the pipeline
+                self.stream_data(answers, queue_size=queue_size)
+            elif parallel:
+                from zombies_jobs import collect_parallel
+                failed = collect_parallel(self, answers, processes=source_processes)
+            else:
+                if self.resume:
+                    self.restore_collected_data()
+                self.collect_sources(answers)
+        except KeyboardInterrupt:
+            if parallel and not stream:
+                from zombies_jobs import state_dir_for
+                state_path = state_dir_for(self.data_dir)
+            else:
+                state_path = self.state.path
+            print(f"\nInterrupted. Finished pages are saved in {state_path}; "
+                  f"run again with --resume to continue.")
+            self.fetcher.close()
+            self.cleaner.close()
+            return list(answers['sources'])
         
-        self.save_data()
-        print("\nData collection completed!")
+        if not stream:
+            self.save_data()
+        print(f"Crawl frontier: {self.frontier.summary()}")
+        if self.fetcher.cache:
+            cache_stats = self.fetcher.cache.stats()
+            print(f"HTTP cache: {cache_stats}")
+            lookups = cache_stats["hits"] + cache_stats["misses"] + cache_stats["revalidated"]
+            if lookups:
+                # Revalidated pages cost a request but no download, so they count as hits
+                metrics.set('cache_hit_ratio', round((cache_stats["hits"] + cache_stats["revalidated"]) / lookups, 4))
+        self.fetcher.close()
+        self.state.close()
+        self.cleaner.close()
+        if failed:
+            print(f"\nData collection completed without: {', '.join(failed)}")
+        else:
+            print("\nData collection completed!")
+        return failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect Black Ops 2 Zombies data")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Maximum concurrent requests")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="Requests per second allowed per host (must be positive)")
+    parser.add_argument('--cache-mode', choices=['default', 'cache-only', 'off'], default='default',
+                        help="'cache-only' replays data/http_cache without touching the network")
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help="Size limit for the on-disk HTTP cache")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip pages finished by an interrupted run and reuse their data")
+    parser.add_argument('--clean-processes', type=int, default=None,
+                        help="Worker processes for text cleaning (default: clean in-process)")
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help="Similarity above which repeated sentences are dropped")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="Keep duplicate sentences")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write each page's records as soon as it is processed instead of at the end")
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help="Pages buffered between streaming stages")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record fetch/parse/clean metrics and a cProfile of the run")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="Where --profile writes its .prom, .json and .prof files")
+    parser.add_argument('--download-nltk-data', action='store_true',
+                        help=f"Download the NLTK resources into {NLTK_DATA_DIR} and exit")
+    parser.add_argument('--sources', nargs='+', default=None,
+                        help="Collect these sources without prompting, each in its own process "
+                             "(e.g. 'COD Fandom' 'Reddit Discussions')")
+    parser.add_argument('--data-types', nargs='+', default=['Maps', 'Weapons'],
+                        help=f"Data types for --sources runs, from: {', '.join(DATA_TYPES)}")
+    parser.add_argument('--source-processes', type=int, default=None,
+                        help="Sources collected at the same time in --sources runs (default: all of them)")
+    parser.add_argument('--config', default=None,
+                        help="JSON job config whose keys are these options' names (e.g. "
+                             "{\"sources\": [...], \"cache_mode\": \"cache-only\"}); flags given here override it")
+    
+    # The config file only supplies defaults, so command-line flags win over it
+    args, _ = parser.parse_known_args()
+    if args.config:
+        from zombies_jobs import load_job_config
+        try:
+            parser.set_defaults(**load_job_config(args.config))
+        except (OSError, ValueError) as e:
+            parser.error(f"--config: {e}")
+    args = parser.parse_args()
+    # Checked after parsing, since a --config value doesn't go through type=
+    if not args.rate > 0:
+        parser.error(f"--rate must be positive, got {args.rate}")
+    unknown = [data_type for data_type in args.data_types if data_type not in DATA_TYPES]
+    if unknown:
+        parser.error(f"unknown data types: {', '.join(unknown)}")
+    return args
 
 if __name__ == "__main__":
-    collector = ZombiesDataCollector()
-    collector.collect_all_data() 
\ No newline at end of file
+    args = parse_args()
+    if args.download_nltk_data:
+        for package in NLTK_RESOURCES:
+            print(f"{package}: {'ok' if ensure_nltk_resource(package) else 'failed'}")
+        raise SystemExit(0)
+    with profiled(args.profile, 'collector', args.profile_dir):
+        collector = ZombiesDataCollector(max_workers=args.workers,
+                                         requests_per_second=args.rate,
+                                         cache_mode=args.cache_mode,
+                                         cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                                         resume=args.resume,
+                                         clean_processes=args.clean_processes,
+                                         dedup_threshold=None if args.no_dedup else args.dedup_threshold)
+        answers = None
+        if args.sources:
+            # Headless run: nothing is prompted, so it can run unattended from cron
+            unknown = [source_name for source_name in args.sources if source_name not in collector.sources]
+            if unknown:
+                print(f"Unknown sources: {', '.join(unknown)}; choose from: {', '.join(collector.sources)}")
+                raise SystemExit(2)
+            answers = {"sources": args.sources, "data_types": args.data_types}
+        failed = collector.collect_all_data(stream=args.stream, queue_size=args.queue_size, answers=answers,
+                                            parallel=answers is not None, source_processes=args.source_processes)
+    if answers is not None and failed:
+        raise SystemExit(1) 
\ No newline at end of file
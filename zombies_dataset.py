@@ -0,0 +1,218 @@
+import json
+import os
+import time
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'datasets')
+MANIFEST = 'manifest.json'
+RUN_METADATA = 'dataset.json'
+SHARD_ROWS = 10000
+
+
+def write_json_atomic(path, payload):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class DatasetWriter:
+    """Writes one collection run as JSONL shards under `root/<timestamp>/`.
+
+    Tables are `structured/<category>` (one {"category", "name", "record"} row
+    per map, weapon, ..., or per crawled page for streamed runs; split by
+    category so readers can skip whole files)
+    and `training` (question/answer rows). The run only becomes visible to
+    readers once commit() points the manifest at it.
+    """
+
+    def __init__(self, root=DATASETS_DIR, timestamp=None, shard_rows=SHARD_ROWS):
+        self.root = root
+        self.timestamp = timestamp or time.strftime("%Y%m%d_%H%M%S")
+        self.run_dir = os.path.join(root, self.timestamp)
+        self.shard_rows = shard_rows
+        self.tables = {}
+        os.makedirs(self.run_dir, exist_ok=True)
+
+    def open_table(self, table):
+        """A TableWriter for rows that arrive one at a time; commit() closes it"""
+        writer = TableWriter(self.run_dir, table, self.shard_rows)
+        self.tables[table] = writer
+        return writer
+
+    def write_table(self, table, rows):
+        writer = self.open_table(table)
+        try:
+            for row in rows:
+                writer.write(row)
+        finally:
+            writer.close()
+
+    def commit(self):
+        for writer in self.tables.values():
+            writer.close()
+        write_json_atomic(os.path.join(self.run_dir, RUN_METADATA),
+                          {"timestamp": self.timestamp,
+                           "tables": {table: writer.summary() for table, writer in self.tables.items()}})
+        manifest_path = os.path.join(self.root, MANIFEST)
+        manifest = read_manifest(self.root)
+        manifest["latest"] = self.timestamp
+        manifest["runs"] = sorted(set(manifest.get("runs", [])) | {self.timestamp})
+        write_json_atomic(manifest_path, manifest)
+        return self.run_dir
+
+
+class TableWriter:
+    """Appends rows to one table's shards, starting a new shard every `shard_rows` rows"""
+
+    def __init__(self, run_dir, table, shard_rows=SHARD_ROWS):
+        self.run_dir = run_dir
+        self.table = table
+        self.shard_rows = shard_rows
+        self.shards = []
+        self.rows = 0
+        self.file = None
+
+    def write(self, row):
+        if self.rows % self.shard_rows == 0:
+            self.close()
+            self.shards.append(f"{self.table.replace('/', '-')}-{len(self.shards):05d}.jsonl")
+            self.file = open(os.path.join(self.run_dir, self.shards[-1]), 'w', encoding='utf-8')
+        self.file.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+        self.file.write('\n')
+        self.rows += 1
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def summary(self):
+        return {"shards": self.shards, "rows": self.rows}
+
+
+def write_dataset(collected_data, training_data, root=DATASETS_DIR, timestamp=None):
+    writer = DatasetWriter(root, timestamp)
+    for category in collected_data:
+        writer.write_table(f'structured/{category}', iter_structured_rows({category: collected_data[category]}))
+    writer.write_table('training', training_data)
+    return writer.commit()
+
+
+def iter_structured_rows(collected_data):
+    for category, records in collected_data.items():
+        for name, record in records.items():
+            yield {"category": category, "name": name, "record": record}
+
+
+def merge_record(current, new):
+    """Merge `new` into `current` the way the collector merges sources: lists are
+    extended, dicts updated and empty values filled in"""
+    for key, value in new.items():
+        if key not in current:
+            current[key] = value
+        elif isinstance(value, list):
+            current[key].extend(value)
+        elif isinstance(value, dict):
+            current[key].update(value)
+        elif not current[key]:
+            current[key] = value
+    return current
+
+
+def read_manifest(root=DATASETS_DIR):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_dataset(path=None, root=DATASETS_DIR):
+    """Dataset location for `path`: a run directory, a legacy .json file, or None for the latest run"""
+    if path:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Dataset {path} not found")
+        return path
+    latest = read_manifest(root).get("latest")
+    if not latest:
+        raise FileNotFoundError(f"No dataset in {root}; run zombies_data_collector.py first")
+    return os.path.join(root, latest)
+
+
+def is_legacy(path):
+    return os.path.isfile(path)
+
+
+def read_tables(path):
+    with open(os.path.join(path, RUN_METADATA), 'r', encoding='utf-8') as f:
+        return json.load(f)["tables"]
+
+
+def iter_rows(path, table, columns=None):
+    """Stream the rows of `table`, keeping only `columns` of each when given"""
+    for shard in read_tables(path).get(table, {}).get("shards", []):
+        with open(os.path.join(path, shard), 'r', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                yield {key: row.get(key) for key in columns} if columns else row
+
+
+def iter_training_examples(path=None, root=DATASETS_DIR):
+    path = resolve_dataset(path, root)
+    if is_legacy(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    yield from iter_rows(path, 'training', columns=['question', 'answer'])
+
+
+def load_training_examples(path=None, root=DATASETS_DIR):
+    return list(iter_training_examples(path, root))
+
+
+def iter_structured_records(path=None, categories=None, fields=None, root=DATASETS_DIR):
+    """Yield (category, name, record) from the structured table.
+
+    `categories` limits which categories are kept and `fields` which record
+    fields are; both are applied while streaming, so skipped data is never held.
+    """
+    path = resolve_dataset(path, root)
+    if is_legacy(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            collected_data = json.load(f)
+        if not isinstance(collected_data, dict):
+            # A legacy training JSON is a list of question/answer pairs, with no records to index
+            raise ValueError(f"{path} is not a structured dataset; expected a dataset directory "
+                             f"or a legacy structured JSON")
+        rows = iter_structured_rows(collected_data)
+    else:
+        tables = [table for table in read_tables(path) if table.startswith('structured/')
+                  and (not categories or table.split('/', 1)[1] in categories)]
+        rows = (row for table in tables for row in iter_rows(path, table))
+    for row in rows:
+        if categories and row["category"] not in categories:
+            continue
+        record = row["record"]
+        if fields and isinstance(record, dict):
+            record = {key: record[key] for key in fields if key in record}
+        yield row["category"], row["name"], record
+
+
+def load_structured(path=None, categories=None, fields=None, root=DATASETS_DIR):
+    """Rebuild the {category: {name: record}} layout the collector works with.
+
+    Streamed runs store one row per crawled page, so a name found on several
+    sources has several rows; they are merged here.
+    """
+    knowledge_base = {}
+    for category, name, record in iter_structured_records(path, categories, fields, root):
+        records = knowledge_base.setdefault(category, {})
+        if name in records and isinstance(record, dict):
+            merge_record(records[name], record)
+        else:
+            records[name] = record
+    return knowledge_base
@@ -0,0 +1,89 @@
+import re
+import zlib
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+NON_WORD = re.compile(r'[^\w\s]')
+
+
+class SentenceDeduplicator:
+    """Streaming exact + near-duplicate detector (word shingles, MinHash, LSH banding).
+
+    Sentences are checked in order and the first occurrence is kept. Each check
+    only compares against sentences sharing an LSH bucket, so total work stays
+    roughly linear in the number of sentences.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, bands=16, shingle_size=3,
+                 max_candidates=50, seed=1):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)[:, None]
+
+        self.exact = set()
+        self.signatures = []
+        self.buckets = [{} for _ in range(bands)]
+        self.stats = {"checked": 0, "exact": 0, "near": 0}
+
+    def normalize(self, text):
+        return ' '.join(NON_WORD.sub(' ', text.lower()).split())
+
+    def signature(self, normalized):
+        words = normalized.split()
+        k = self.shingle_size
+        shingles = {' '.join(words[i:i + k]) for i in range(max(len(words) - k + 1, 1))}
+        hashes = np.array([zlib.crc32(s.encode('utf-8')) for s in shingles], dtype=np.uint64)[None, :]
+        # Overflow wraps modulo 2**64, as in the usual numpy MinHash formulation
+        permuted = np.bitwise_and((self.a * hashes + self.b) % MERSENNE_PRIME, MAX_HASH)
+        return permuted.min(axis=1)
+
+    def is_duplicate(self, text):
+        """Return True if `text` repeats an earlier sentence, otherwise remember it"""
+        self.stats["checked"] += 1
+        normalized = self.normalize(text)
+        if normalized in self.exact:
+            self.stats["exact"] += 1
+            return True
+
+        signature = self.signature(normalized)
+        keys = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates = []
+        for bucket, key in zip(self.buckets, keys):
+            candidates.extend(bucket.get(key, ()))
+        for candidate in list(dict.fromkeys(candidates))[:self.max_candidates]:
+            # Estimated Jaccard similarity of the two shingle sets
+            if np.mean(signature == self.signatures[candidate]) >= self.threshold:
+                self.stats["near"] += 1
+                return True
+
+        self.exact.add(normalized)
+        sentence_id = len(self.signatures)
+        self.signatures.append(signature)
+        for bucket, key in zip(self.buckets, keys):
+            bucket.setdefault(key, []).append(sentence_id)
+        return False
+
+    def dedup(self, sentences):
+        return [sentence for sentence in sentences if not self.is_duplicate(sentence)]
+
+
+def dedup_collected_data(collected_data, deduplicator=None):
+    """Drop repeated sentences from every list field, within and across records, in place"""
+    deduplicator = deduplicator or SentenceDeduplicator()
+    for category in collected_data:
+        for item_data in collected_data[category].values():
+            if not isinstance(item_data, dict):
+                continue
+            for key, value in item_data.items():
+                if isinstance(value, list) and all(isinstance(text, str) for text in value):
+                    item_data[key] = deduplicator.dedup(value)
+    return deduplicator.stats
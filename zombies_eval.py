@@ -0,0 +1,261 @@
+import argparse
+import json
+import math
+import re
+import string
+import time
+from collections import Counter
+
+import numpy as np
+
+ARTICLES = re.compile(r'\b(a|an|the)\b')
+PUNCTUATION = str.maketrans('', '', string.punctuation)
+SUMMARY_METRICS = ['exact_match', 'f1', 'perplexity', 'latency_p50_ms', 'latency_p95_ms',
+                   'tokens_per_second', 'generated_tokens']
+
+
+def normalize_answer(text):
+    """Lowercase, drop punctuation and articles and collapse whitespace, as SQuAD scoring does"""
+    text = text.lower().translate(PUNCTUATION)
+    return ' '.join(ARTICLES.sub(' ', text).split())
+
+
+def exact_match(prediction, reference):
+    return float(normalize_answer(prediction) == normalize_answer(reference))
+
+
+def token_f1(prediction, reference):
+    """Harmonic mean of the precision and recall of the prediction's words against the reference's"""
+    predicted = normalize_answer(prediction).split()
+    expected = normalize_answer(reference).split()
+    if not predicted or not expected:
+        return float(predicted == expected)
+    common = sum((Counter(predicted) & Counter(expected)).values())
+    if not common:
+        return 0.0
+    precision = common / len(predicted)
+    recall = common / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+
+def length_batches(lengths, batch_size):
+    """Index lists of up to `batch_size` items of similar length, so batches carry little padding"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def percentile_ms(seconds, q):
+    return round(float(np.percentile(seconds, q)) * 1000, 2) if seconds else None
+
+
+def load_examples(data_path=None, split='held-out', max_examples=None):
+    """Question/answer pairs of a dataset (the latest by default), from the same
+    content-hash split training uses"""
+    from train_zombies_model import split_examples
+    from zombies_dataset import load_training_examples
+
+    examples = load_training_examples(data_path)
+    if split != 'all':
+        train, held_out = split_examples(examples)
+        examples = held_out if split == 'held-out' else train
+    # A record without a description gives an empty answer, which can't be scored
+    examples = [example for example in examples if example['answer'].strip()]
+    return examples[:max_examples] if max_examples else examples
+
+
+def answer_perplexity(bot, examples, batch_size=8):
+    """Perplexity of the reference answers given their questions; question tokens aren't scored"""
+    import torch
+    import torch.nn.functional as F
+
+    tokenizer = bot.tokenizer
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    max_length = bot.model.config.n_positions
+    sequences = []
+    for example in examples:
+        # The layout training uses: question<sep>answer<|endoftext|>
+        prompt_ids = tokenizer.encode(example['question'] + tokenizer.sep_token)
+        answer_ids = tokenizer.encode(example['answer'] + tokenizer.eos_token)
+        sequences.append(((prompt_ids + answer_ids)[:max_length], len(prompt_ids)))
+
+    total_loss, total_tokens = 0.0, 0
+    with torch.no_grad():
+        for batch in length_batches([len(ids) for ids, _ in sequences], batch_size):
+            width = max(len(sequences[i][0]) for i in batch)
+            input_ids = torch.full((len(batch), width), pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+            labels = torch.full((len(batch), width), -100, dtype=torch.long)
+            for row, i in enumerate(batch):
+                ids, prompt_length = sequences[i]
+                input_ids[row, :len(ids)] = torch.tensor(ids)
+                attention_mask[row, :len(ids)] = 1
+                labels[row, prompt_length:len(ids)] = torch.tensor(ids[prompt_length:], dtype=torch.long)
+            logits = bot.model(input_ids=input_ids, attention_mask=attention_mask).logits
+            labels = labels[:, 1:].reshape(-1)
+            total_loss += F.cross_entropy(logits[:, :-1].reshape(-1, logits.shape[-1]).float(), labels,
+                                          ignore_index=-100, reduction='sum').item()
+            total_tokens += int((labels != -100).sum())
+    return math.exp(total_loss / total_tokens) if total_tokens else None
+
+
+def answer_questions(bot, questions, batch_size=8, max_new_tokens=64, use_knowledge_base=False, **decoding):
+    """Answer every question, generating in length-sorted batches. Returns one
+    {"prediction", "tokens", "seconds", "source"} per question, in input order, and
+    the seconds spent in each generate call."""
+    results = [None] * len(questions)
+    prompts = list(questions)
+    if use_knowledge_base:
+        # As in the chat: factual questions are answered from the index, the rest get RAG prompts
+        for i, question in enumerate(questions):
+            start = time.perf_counter()
+            answer = bot.answer_from_knowledge_base(question)
+            if answer:
+                results[i] = {"prediction": answer, "tokens": 0, "seconds": time.perf_counter() - start,
+                              "source": "knowledge_base"}
+            else:
+                prompts[i] = bot.build_prompt(question)
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    lengths = [len(bot.tokenizer.encode(prompts[i])) for i in pending]
+    batch_seconds = []
+    for batch in length_batches(lengths, batch_size):
+        indices = [pending[j] for j in batch]
+        start = time.perf_counter()
+        generated = bot.generate_texts([prompts[i] for i in indices], max_new_tokens, **decoding)
+        seconds = time.perf_counter() - start
+        batch_seconds.append(seconds)
+        for i, (response, tokens) in zip(indices, generated):
+            # Every question in a batch waits for the whole batch
+            results[i] = {"prediction": response, "tokens": tokens, "seconds": seconds, "source": "model"}
+    return results, batch_seconds
+
+
+def evaluate(bot, examples, batch_size=8, max_new_tokens=64, use_knowledge_base=False, **decoding):
+    """Latency, throughput and quality of `bot` on question/answer pairs"""
+    results, batch_seconds = answer_questions(bot, [example['question'] for example in examples], batch_size,
+                                              max_new_tokens, use_knowledge_base, **decoding)
+    predictions = []
+    for example, result in zip(examples, results):
+        predictions.append({
+            "question": example['question'],
+            "answer": example['answer'],
+            "prediction": result['prediction'],
+            "source": result['source'],
+            "exact_match": exact_match(result['prediction'], example['answer']),
+            "f1": round(token_f1(result['prediction'], example['answer']), 4),
+            "tokens": result['tokens'],
+            "latency_ms": round(result['seconds'] * 1000, 2)
+        })
+
+    latencies = [result['seconds'] for result in results]
+    generated_tokens = sum(result['tokens'] for result in results)
+    generate_seconds = sum(batch_seconds)
+    perplexity = answer_perplexity(bot, examples, batch_size)
+    summary = {
+        "examples": len(examples),
+        "exact_match": round(float(np.mean([p['exact_match'] for p in predictions])), 4) if predictions else None,
+        "f1": round(float(np.mean([p['f1'] for p in predictions])), 4) if predictions else None,
+        "perplexity": round(perplexity, 3) if perplexity is not None else None,
+        "latency_p50_ms": percentile_ms(latencies, 50),
+        "latency_p95_ms": percentile_ms(latencies, 95),
+        "batches": len(batch_seconds),
+        "generated_tokens": generated_tokens,
+        "generate_seconds": round(generate_seconds, 3),
+        "tokens_per_second": round(generated_tokens / generate_seconds, 1) if generate_seconds else None,
+        "knowledge_base_answers": sum(result['source'] == 'knowledge_base' for result in results)
+    }
+    return summary, predictions
+
+
+def print_summary(summary, baseline=None):
+    if baseline is None:
+        for key in SUMMARY_METRICS:
+            print(f"{key:<20}{str(summary[key]):>12}")
+        return
+    print(f"{'':<20}{'baseline':>12}{'this run':>12}")
+    for key in SUMMARY_METRICS:
+        print(f"{key:<20}{str(baseline.get(key)):>12}{str(summary[key]):>12}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate a Zombies model on question/answer pairs")
+    parser.add_argument('--model-dir', default='./zombies_model_final')
+    parser.add_argument('--quantized', action='store_true',
+                        help="Load an int8 checkpoint written by zombies_quantize.py export")
+    parser.add_argument('--data', default=None,
+                        help="Dataset directory or legacy training JSON (default: latest collected dataset)")
+    parser.add_argument('--knowledge-base', default=None,
+                        help="Dataset directory or legacy structured JSON to index for the chat's knowledge "
+                             "base (default: latest collected dataset)")
+    parser.add_argument('--split', choices=['held-out', 'train', 'all'], default='held-out',
+                        help="Which side of training's content-hash split to evaluate on")
+    parser.add_argument('--max-examples', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help="Questions generated together; batches are formed from questions of similar length")
+    parser.add_argument('--max-new-tokens', type=int, default=64)
+    parser.add_argument('--temperature', type=float, default=0.0,
+                        help="Sampling temperature; 0 decodes greedily, so runs are comparable")
+    parser.add_argument('--top-k', type=int, default=50)
+    parser.add_argument('--top-p', type=float, default=0.95)
+    parser.add_argument('--no-repeat-ngram-size', type=int, default=3)
+    parser.add_argument('--use-knowledge-base', action='store_true',
+                        help="Answer factual questions from the index first, as the chat does")
+    parser.add_argument('--rag-passages', type=int, default=0,
+                        help="With --use-knowledge-base, prefix generated answers' prompts with this many passages")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='eval_results.json')
+    parser.add_argument('--baseline', default=None,
+                        help="Results file of an earlier run to print side by side with this one")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import torch
+    from zombies_chat import ZombiesBot
+
+    torch.manual_seed(args.seed)
+    examples = load_examples(args.data, args.split, args.max_examples)
+    if not examples:
+        print(f"No {args.split} examples to evaluate")
+        return 1
+    try:
+        bot = ZombiesBot(model_dir=args.model_dir, knowledge_base_path=args.knowledge_base,
+                         rag_passages=args.rag_passages, quantized=args.quantized)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Cannot open the knowledge base: {e}")
+        return 1
+    decoding = dict(temperature=args.temperature, top_k=args.top_k, top_p=args.top_p,
+                    no_repeat_ngram_size=args.no_repeat_ngram_size)
+    print(f"Evaluating {len(examples)} {args.split} examples...")
+    summary, predictions = evaluate(bot, examples, args.batch_size, args.max_new_tokens,
+                                    args.use_knowledge_base, **decoding)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model_dir": args.model_dir,
+        "quantized": args.quantized,
+        "data": args.data,
+        "knowledge_base": args.knowledge_base,
+        "split": args.split,
+        "settings": {"batch_size": args.batch_size, "max_new_tokens": args.max_new_tokens,
+                     "use_knowledge_base": args.use_knowledge_base, "rag_passages": args.rag_passages,
+                     "seed": args.seed, **decoding},
+        "summary": summary,
+        "predictions": predictions
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["summary"]
+    print()
+    print_summary(summary, baseline)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
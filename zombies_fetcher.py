@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from zombies_metrics import metrics
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+}
+
+FetchResult = namedtuple('FetchResult', ['url', 'final_url', 'status', 'text'])
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` at once"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ZombiesFetcher:
+    """Pooled keep-alive HTTP client with per-host rate limits and bounded concurrency"""
+
+    def __init__(self, max_workers=8, requests_per_second=1.0, burst=1,
+                 host_rates=None, timeout=10, headers=None, cache=None, cache_mode='default'):
+        # A rate of 0 would never refill a bucket
+        for host, rate in [(None, requests_per_second), *dict(host_rates or {}).items()]:
+            if not rate > 0:
+                raise ValueError(f"Requests per second{f' for {host}' if host else ''} must be positive, got {rate}")
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        # host -> requests per second, overrides the default politeness budget
+        self.host_rates = dict(host_rates or {})
+        self.timeout = timeout
+        # 'default' serves fresh entries and revalidates stale ones,
+        # 'cache-only' never touches the network
+        self.cache = cache
+        self.cache_mode = cache_mode
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+        self.in_flight = threading.BoundedSemaphore(max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def bucket_for(self, url):
+        host = urlparse(url).netloc.lower()
+        with self.buckets_lock:
+            if host not in self.buckets:
+                rate = self.host_rates.get(host, self.requests_per_second)
+                self.buckets[host] = TokenBucket(rate, self.burst)
+            return self.buckets[host]
+
+    def request(self, url, headers, bucket, host):
+        """One rate-limited GET, recording its latency, status and size"""
+        wait_start = time.perf_counter()
+        bucket.acquire()
+        metrics.inc('rate_limit_wait_seconds_total', time.perf_counter() - wait_start, host=host)
+        with self.in_flight:
+            request_start = time.perf_counter()
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            metrics.observe('fetch_seconds', time.perf_counter() - request_start, host=host)
+        metrics.inc('fetch_responses_total', host=host, status=response.status_code)
+        metrics.inc('fetch_bytes_total', len(response.content), host=host)
+        return response
+
+    def fetch(self, url, retry_count=3):
+        """Fetch a URL, returning a FetchResult or None after `retry_count` failures"""
+        host = urlparse(url).netloc.lower()
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and (self.cache_mode == 'cache-only' or self.cache.is_fresh(entry)):
+            text = self.cache.read_body(entry)
+            if text is not None:
+                self.cache.touch(url)
+                metrics.inc('cache_requests_total', result='hit', host=host)
+                return FetchResult(url, entry.final_url, 200, text)
+            entry = None
+        if self.cache_mode == 'cache-only':
+            if self.cache:
+                self.cache.miss()
+                metrics.inc('cache_requests_total', result='miss', host=host)
+            print(f"Not in cache (cache-only mode): {url}")
+            return None
+
+        headers = {}
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+        bucket = self.bucket_for(url)
+        for attempt in range(retry_count):
+            try:
+                response = self.request(url, headers, bucket, host)
+                if response.status_code == 304 and entry:
+                    text = self.cache.read_body(entry)
+                    if text is not None:
+                        self.cache.touch(url, revalidated=True)
+                        metrics.inc('cache_requests_total', result='revalidated', host=host)
+                        return FetchResult(url, entry.final_url, 200, text)
+                    # Cached body went missing; fetch it unconditionally, without using up an attempt
+                    entry, headers = None, {}
+                    response = self.request(url, headers, bucket, host)
+                response.raise_for_status()
+                if self.cache:
+                    self.cache.miss()
+                    metrics.inc('cache_requests_total', result='miss', host=host)
+                    self.cache.store(url, response.url, response.text,
+                                     etag=response.headers.get('ETag'),
+                                     last_modified=response.headers.get('Last-Modified'))
+                return FetchResult(url, response.url, response.status_code, response.text)
+            except Exception as e:
+                print(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
+                if attempt == retry_count - 1:
+                    print(f"Failed to fetch {url} after {retry_count} attempts")
+                    metrics.inc('fetch_failures_total', host=host)
+                    return None
+                metrics.inc('fetch_retries_total', host=host)
+                metrics.inc('fetch_backoff_seconds_total', 2 ** attempt, host=host)
+                time.sleep(2 ** attempt)  # Exponential backoff
+
+    def fetch_many(self, urls, retry_count=3):
+        """Fetch URLs concurrently, yielding (url, FetchResult or None) in input order"""
+        futures = [(url, self.executor.submit(self.fetch, url, retry_count)) for url in urls]
+        for url, future in futures:
+            yield url, future.result()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+        if self.cache:
+            self.cache.close()
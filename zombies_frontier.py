@@ -0,0 +1,177 @@
+import re
+import threading
+from urllib.parse import quote, unquote, urljoin, urlsplit, urlunsplit
+
+from zombies_metrics import metrics
+
+# MediaWiki/Fandom namespaces that never hold articles; any "<namespace>_talk" is skipped too
+NON_ARTICLE_NAMESPACES = frozenset({
+    'file', 'image', 'media', 'special', 'talk', 'user', 'user_blog', 'user_blog_comment',
+    'template', 'category', 'mediawiki', 'help', 'forum', 'module', 'message_wall',
+    'board', 'thread', 'blog', 'map', 'gallery', 'widget',
+})
+# Characters MediaWiki leaves unescaped in article URLs
+TITLE_SAFE_CHARS = "/:;@$!*(),~'"
+CANONICAL_LINK = re.compile(r'<link\b[^>]*\brel=["\']canonical["\'][^>]*>', re.IGNORECASE)
+HREF_ATTR = re.compile(r'\bhref=["\']([^"\']+)["\']', re.IGNORECASE)
+# Where the article links are, most specific first; everything else on the page is
+# navigation chrome. Category pages list their members outside the article text.
+CONTENT_SELECTORS = [{'class_': 'category-page__members'}, {'id': 'mw-pages'}, {'class_': 'mw-parser-output'}]
+# Lower sorts first: plain article links, then links through redirects, then navboxes
+PRIORITY_CONTENT = 0
+PRIORITY_REDIRECT = 1
+PRIORITY_NAVBOX = 2
+
+
+def canonicalize(href, page_url):
+    """The canonical URL of the wiki article `href` points to (resolved against `page_url`), or None.
+
+    Fragments are dropped, escaping and spaces/underscores are normalised and the
+    title's first letter is upper-cased, as MediaWiki does. Links with a query
+    string (edit, history, diff) and links into non-article namespaces give None.
+    """
+    url = urlsplit(urljoin(page_url, href))
+    if url.scheme not in ('http', 'https') or url.query or not url.path.startswith('/wiki/'):
+        return None
+    title = re.sub(r'[_ ]+', '_', unquote(url.path[len('/wiki/'):])).strip('_')
+    if not title:
+        return None
+    namespace, has_namespace, _ = title.partition(':')
+    namespace = namespace.lower()
+    if has_namespace and (namespace in NON_ARTICLE_NAMESPACES or namespace.endswith('_talk')):
+        return None
+    title = title[0].upper() + title[1:]
+    return urlunsplit((url.scheme, host_of(url.geturl()), '/wiki/' + quote(title, safe=TITLE_SAFE_CHARS), '', ''))
+
+
+def host_of(url):
+    """Lowercased host, with the port only when it isn't the default"""
+    url = urlsplit(url)
+    host = url.hostname or ''
+    return f'{host}:{url.port}' if url.port and url.port not in (80, 443) else host
+
+
+def canonical_link(html):
+    """The href of the page's <link rel="canonical">, or None"""
+    match = CANONICAL_LINK.search(html or '')
+    href = HREF_ATTR.search(match.group(0)) if match else None
+    return href.group(1) if href else None
+
+
+def content_root(soup):
+    """The page element holding its article links, or the whole page if there is none"""
+    for selector in CONTENT_SELECTORS:
+        root = soup.find(**selector)
+        if root is not None:
+            return root
+    return soup
+
+
+class CrawlFrontier:
+    """The wiki articles a run has discovered, each queued once across every source.
+
+    Links are canonicalized before they are compared, so anchors that differ only by
+    fragment, escaping or first-letter case count once. Links in navigation chrome,
+    into non-article namespaces or to other hosts are dropped. After a page is
+    fetched, claim() learns where it redirected to (the final URL or the page's
+    canonical link), so an alias of an article that was already fetched is skipped,
+    and isn't queued again if another page links to it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.seen = set()       # Canonical URLs already queued
+        self.claimed = set()    # Canonical URLs of articles already fetched, after redirects
+        self.aliases = {}       # Redirecting URL -> canonical URL of its target
+        self.stats = {"links": 0, "queued": 0, "duplicate": 0, "filtered": 0, "offsite": 0, "redirected": 0}
+
+    def count(self, result, amount=1):
+        self.stats[result] += amount
+        metrics.inc('frontier_links_total', amount, result=result)
+
+    def resolve(self, url):
+        return self.aliases.get(url, url)
+
+    def discover(self, soup, page_url, link_filter=None, min_name_length=1):
+        """Queue the article links on a listing page, returning the new ones as (name, url)
+        in priority order.
+
+        `link_filter(name, href, heading)` can narrow the links further; `heading` is
+        the lowercased h2/h3 the link appears under, or None.
+        """
+        host = host_of(page_url)
+        root = content_root(soup)
+        navbox_links = {id(link) for navbox in root.find_all(class_='navbox')
+                        for link in navbox.find_all('a', href=True)}
+        candidates = []
+        heading = None
+        for elem in root.find_all(['h2', 'h3', 'a']):
+            if elem.name != 'a':
+                # Infobox labels are headings too, but they don't open a section
+                if elem.find_parent('aside') is None:
+                    heading = elem.get_text().strip().lower()
+                continue
+            if not elem.get('href'):
+                continue
+            name = elem.get_text().strip()
+            if len(name) < min_name_length:
+                continue
+            if link_filter and not link_filter(name, elem['href'], heading):
+                continue
+            if id(elem) in navbox_links:
+                priority = PRIORITY_NAVBOX
+            elif 'mw-redirect' in elem.get('class', []):
+                priority = PRIORITY_REDIRECT
+            else:
+                priority = PRIORITY_CONTENT
+            candidates.append((priority, len(candidates), name, elem['href']))
+
+        queued = []
+        with self.lock:
+            self.count('links', len(candidates))
+            # A stable sort, so links of equal priority keep their page order
+            for priority, _, name, href in sorted(candidates):
+                url = canonicalize(href, page_url)
+                # Section links (#Maps) point back at the listing page itself
+                if url is None or urlsplit(url).path == urlsplit(page_url).path:
+                    self.count('filtered')
+                    continue
+                if host_of(url) != host:
+                    self.count('offsite')
+                    continue
+                url = self.resolve(url)
+                if url in self.seen or url in self.claimed:
+                    self.count('duplicate')
+                    continue
+                self.seen.add(url)
+                self.count('queued')
+                queued.append((name, url))
+        return queued
+
+    def claim(self, url, final_url=None, html=None):
+        """Record that `url` was fetched; False if it redirected to an article already fetched"""
+        target = None
+        link = canonical_link(html)
+        if link:
+            # A canonical link on another host points at a mirror, not a redirect
+            target = canonicalize(link, url)
+            if target and host_of(target) != host_of(url):
+                target = None
+        if target is None and final_url:
+            target = canonicalize(final_url, url)
+        target = target or url
+        with self.lock:
+            if target != url:
+                self.aliases[url] = target
+                self.count('redirected')
+            if target in self.claimed:
+                return False
+            self.claimed.add(target)
+            return True
+
+    def summary(self):
+        with self.lock:
+            return dict(self.stats)
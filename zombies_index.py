@@ -0,0 +1,326 @@
+import argparse
+import difflib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+INDEX_VERSION = 1
+TOKEN_PATTERN = re.compile(r'\w+')
+QUERY_STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'can', 'do', 'does', 'for', 'how', 'i', 'in', 'is', 'it',
+    'me', 'of', 'on', 'tell', 'the', 'to', 'what', 'where', 'which', 'who', 'with', 'you'
+})
+# Question wording -> record field that answers it, in order of preference. Keywords
+# match whole words of the tokenized question, so "pack-a-punch" is "pack a punch".
+INTENT_FIELDS = [
+    (['pack a punch', 'pack a punched', 'upgrade', 'upgraded', 'pap'], "pack_a_punch"),
+    (['stat', 'stats', 'damage', 'ammo', 'fire rate', 'magazine', 'mag size'], "stats"),
+    (['easter egg', 'easter eggs', 'secret', 'secrets'], "easter_eggs"),
+    (['strategy', 'strategies', 'tip', 'tips', 'guide', 'survive'], "strategies"),
+    (['where', 'location', 'locations', 'find', 'get the'], "locations"),
+    (['feature', 'features', 'mechanic', 'mechanics'], "features"),
+    (['weapon', 'weapons', 'gun', 'guns'], "weapons"),
+    (['what is', 'what s', 'tell me about', 'describe', 'who is'], "description"),
+]
+INTENT_PATTERNS = [(re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b'), field)
+                   for keywords, field in INTENT_FIELDS]
+FUZZY_CUTOFF = 0.85
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_name(name):
+    return ' '.join(tokenize(name))
+
+
+def trigrams(text):
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def render_field(value):
+    """Flatten a record field into passage text, the way create_training_data joins answers"""
+    if isinstance(value, dict):
+        return ". ".join(f"{k}: {v}" for k, v in value.items())
+    if isinstance(value, list):
+        return ". ".join(str(v) for v in value)
+    return str(value)
+
+
+def index_dir_for(dataset_path):
+    if os.path.isfile(dataset_path):
+        # Legacy single-file JSON dataset
+        return dataset_path + '.index'
+    return os.path.join(dataset_path, 'index')
+
+
+def build_index(records, index_dir, k1=1.5, b=0.75):
+    """Write a BM25 index over every field of the (category, name, record) rows of a structured dataset"""
+    os.makedirs(index_dir, exist_ok=True)
+    names, passages, passage_meta = [], [], []
+    postings = defaultdict(list)
+    doc_lens = []
+    record_blobs = []
+
+    for category, name, record in records:
+        names.append([category, name])
+        record_blobs.append(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        if not isinstance(record, dict):
+            continue
+        for field, value in record.items():
+            text = render_field(value).strip()
+            if field == "source" or not text:
+                continue
+            doc_id = len(passages)
+            passages.append(text.encode('utf-8'))
+            passage_meta.append([len(names) - 1, field])
+            # The record name is indexed with every passage so "ray gun damage" finds Ray Gun stats
+            counts = Counter(tokenize(f"{name} {field.replace('_', ' ')} {text}"))
+            doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((doc_id, tf))
+
+    terms = {}
+    docs, tfs = [], []
+    for term in sorted(postings):
+        terms[term] = [len(docs), len(postings[term])]
+        for doc_id, tf in postings[term]:
+            docs.append(doc_id)
+            tfs.append(min(tf, np.iinfo(np.uint16).max))
+
+    def write_blobs(prefix, blobs):
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        with open(os.path.join(index_dir, f'{prefix}.bin'), 'wb') as f:
+            for i, blob in enumerate(blobs):
+                f.write(blob)
+                offsets[i + 1] = offsets[i] + len(blob)
+        np.save(os.path.join(index_dir, f'{prefix}_offsets.npy'), offsets)
+
+    np.save(os.path.join(index_dir, 'postings_docs.npy'), np.array(docs, dtype=np.int32))
+    np.save(os.path.join(index_dir, 'postings_tf.npy'), np.array(tfs, dtype=np.uint16))
+    np.save(os.path.join(index_dir, 'doc_lens.npy'), np.array(doc_lens, dtype=np.float32))
+    write_blobs('passages', passages)
+    write_blobs('records', record_blobs)
+    meta = {
+        "version": INDEX_VERSION,
+        "k1": k1,
+        "b": b,
+        "num_docs": len(passages),
+        "avg_doc_len": float(np.mean(doc_lens)) if doc_lens else 0.0,
+        "terms": terms,
+        "names": names,
+        "passages": passage_meta
+    }
+    with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def build_index_file(dataset_path=None):
+    """Index a stored dataset (the latest one by default), streaming its records"""
+    from zombies_dataset import iter_structured_records, resolve_dataset
+
+    dataset_path = resolve_dataset(dataset_path)
+    index_dir = index_dir_for(dataset_path)
+    build_index(iter_structured_records(dataset_path), index_dir)
+    return index_dir
+
+
+class BlobStore:
+    """Variable-length byte records read from a memory-mapped file"""
+
+    def __init__(self, index_dir, prefix):
+        self.offsets = np.load(os.path.join(index_dir, f'{prefix}_offsets.npy'), mmap_mode='r')
+        with open(os.path.join(index_dir, f'{prefix}.bin'), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __getitem__(self, i):
+        return self.data[int(self.offsets[i]):int(self.offsets[i + 1])].decode('utf-8')
+
+
+class ZombiesIndex:
+    """Memory-mapped BM25 + fuzzy-name index over the structured knowledge base"""
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta["version"] != INDEX_VERSION:
+            raise ValueError(f"Index {index_dir} has version {meta['version']}, expected {INDEX_VERSION}")
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.num_docs = meta["num_docs"]
+        self.avg_doc_len = meta["avg_doc_len"] or 1.0
+        self.terms = meta["terms"]
+        self.names = meta["names"]
+        self.passage_meta = meta["passages"]
+
+        self.postings_docs = np.load(os.path.join(index_dir, 'postings_docs.npy'), mmap_mode='r')
+        self.postings_tf = np.load(os.path.join(index_dir, 'postings_tf.npy'), mmap_mode='r')
+        self.doc_lens = np.load(os.path.join(index_dir, 'doc_lens.npy'), mmap_mode='r')
+        self.passages = BlobStore(index_dir, 'passages')
+        self.records = BlobStore(index_dir, 'records')
+
+        self.name_ids = defaultdict(list)   # normalized name -> name ids
+        self.name_trigrams = defaultdict(set)
+        self.record_passages = defaultdict(dict)  # name id -> field -> passage id
+        for name_id, (_, name) in enumerate(self.names):
+            normalized = normalize_name(name)
+            self.name_ids[normalized].append(name_id)
+            for gram in trigrams(normalized):
+                self.name_trigrams[gram].add(normalized)
+        for doc_id, (name_id, field) in enumerate(self.passage_meta):
+            self.record_passages[name_id][field] = doc_id
+        self.max_name_words = max((len(name.split()) for name in self.name_ids), default=0)
+
+    @classmethod
+    def open(cls, dataset_path=None):
+        """Open the index stored with `dataset_path` (default: latest dataset), building it on first use"""
+        from zombies_dataset import resolve_dataset
+
+        dataset_path = resolve_dataset(dataset_path)
+        index_dir = index_dir_for(dataset_path)
+        if not os.path.exists(os.path.join(index_dir, 'meta.json')):
+            print(f"Building knowledge base index for {dataset_path}...")
+            build_index_file(dataset_path)
+        return cls(index_dir)
+
+    def get_record(self, category, name):
+        """The record for `name`, merged across rows when a streamed run stored one per source page"""
+        from zombies_dataset import merge_record
+
+        record = None
+        for name_id in self.name_ids.get(normalize_name(name), []):
+            if self.names[name_id][0] != category:
+                continue
+            row = json.loads(self.records[name_id])
+            record = row if record is None else merge_record(record, row)
+        return record
+
+    def match_names(self, query):
+        """Name ids mentioned in the query: exact phrase matches, else the closest fuzzy match"""
+        return self.find_name(query)[1]
+
+    def find_name(self, query):
+        """The words of the query that name a record (or None), and the name ids they match"""
+        words = tokenize(query)
+        # Longest word windows first, so "Ray Gun Mark II" wins over "Ray Gun"
+        windows = [' '.join(words[start:start + size])
+                   for size in range(min(self.max_name_words, len(words)), 0, -1)
+                   for start in range(len(words) - size + 1)]
+        for window in windows:
+            if window in self.name_ids:
+                return window, self.name_ids[window]
+
+        best, best_ratio, best_window = None, FUZZY_CUTOFF, None
+        for window in windows:
+            # Misspelled names don't start or end on "the", "of", ...
+            window_words = window.split()
+            if len(window) < 3 or window_words[0] in QUERY_STOPWORDS or window_words[-1] in QUERY_STOPWORDS:
+                continue
+            shared = {}
+            for gram in trigrams(window):
+                for normalized in self.name_trigrams.get(gram, ()):
+                    shared[normalized] = shared.get(normalized, 0) + 1
+            if not shared:
+                continue
+            matcher = difflib.SequenceMatcher(None, b=window)
+            for normalized in heapq.nlargest(5, shared, key=shared.get):
+                matcher.set_seq1(normalized)
+                if (matcher.real_quick_ratio() > best_ratio and matcher.quick_ratio() > best_ratio
+                        and matcher.ratio() > best_ratio):
+                    best, best_ratio, best_window = normalized, matcher.ratio(), window
+        return (best_window, self.name_ids[best]) if best else (None, [])
+
+    def search(self, query, k=3):
+        """Top-k passages by BM25 (names mentioned in the query get a boost), as dicts"""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)) - QUERY_STOPWORDS:
+            if term not in self.terms:
+                continue
+            offset, df = self.terms[term]
+            docs = self.postings_docs[offset:offset + df]
+            tf = self.postings_tf[offset:offset + df].astype(np.float32)
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lens[docs] / self.avg_doc_len)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Passages of a record named in the query outrank term matches elsewhere
+        for name_id in self.match_names(query):
+            for doc_id in self.record_passages[name_id].values():
+                scores[doc_id] = 2 * scores[doc_id] + 1.0
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.passage(int(doc_id), float(scores[doc_id])) for doc_id in top]
+
+    def passage(self, doc_id, score=None):
+        name_id, field = self.passage_meta[doc_id]
+        category, name = self.names[name_id]
+        return {
+            "category": category,
+            "name": name,
+            "field": field,
+            "text": self.passages[doc_id],
+            "score": score
+        }
+
+    def answer(self, question):
+        """Answer factual questions (stats, locations, ...) straight from the index, or None"""
+        window, name_ids = self.find_name(question)
+        if not name_ids:
+            return None
+        # The record's own name says nothing about the intent: "gun" in "Ray Gun" isn't asking for weapons
+        wording = ' '.join(tokenize(question))
+        wording = re.sub(r'\b' + re.escape(window) + r'\b', ' ', wording, count=1)
+        for pattern, field in INTENT_PATTERNS:
+            if not pattern.search(wording):
+                continue
+            # A record without this field may still have the next intent's
+            for name_id in name_ids:
+                doc_id = self.record_passages[name_id].get(field)
+                if doc_id is not None:
+                    return self.passages[doc_id]
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the knowledge base index")
+    parser.add_argument('dataset', nargs='?', default=None,
+                        help="Dataset directory or legacy structured JSON (default: latest dataset)")
+    parser.add_argument('--query', help="Search the index instead of rebuilding it")
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    if not args.query:
+        start = time.perf_counter()
+        index_dir = build_index_file(args.dataset)
+        print(f"Index written to {index_dir} in {time.perf_counter() - start:.2f}s")
+        return
+
+    index = ZombiesIndex.open(args.dataset)
+    start = time.perf_counter()
+    direct = index.answer(args.query)
+    results = index.search(args.query, args.k)
+    elapsed = (time.perf_counter() - start) * 1000
+    if direct:
+        print(f"Direct answer: {direct}\n")
+    for result in results:
+        print(f"[{result['score']:.2f}] {result['category']}/{result['name']} ({result['field']}): "
+              f"{result['text'][:200]}")
+    print(f"\n{elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from zombies_metrics import metrics
+
+# Keys a job config file may set; each one is the dest of the collector flag of the same name
+JOB_CONFIG_KEYS = frozenset({
+    'sources', 'data_types', 'source_processes', 'workers', 'rate', 'cache_mode', 'cache_max_mb',
+    'resume', 'clean_processes', 'dedup_threshold', 'no_dedup', 'stream', 'queue_size',
+    'profile', 'profile_dir',
+})
+
+
+def load_job_config(path):
+    """Read a JSON job config, e.g. {"sources": ["COD Fandom"], "data_types": ["Maps"], "rate": 2.0}"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    unknown = sorted(set(config) - JOB_CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"{path}: unknown keys {', '.join(unknown)}")
+    return config
+
+
+def state_dir_for(data_dir):
+    """Where per-source workers keep their crawl state"""
+    return os.path.join(data_dir, 'crawl_state')
+
+
+def source_state_path(data_dir, source_name):
+    slug = re.sub(r'[^a-z0-9]+', '_', source_name.lower()).strip('_')
+    return os.path.join(state_dir_for(data_dir), f'{slug}.sqlite')
+
+
+def collect_source_worker(source_name, source, data_types, settings, record_metrics=False):
+    """Collect one source in a worker process and return its part of the data.
+
+    The worker has its own session, rate limiter, crawl frontier and crawl state
+    (data/crawl_state/<source>.sqlite), so sources never wait on each other.
+    The HTTP cache is shared; its index is in WAL mode, so processes can write
+    to it at the same time. With `record_metrics` (the parent runs with --profile),
+    the worker's fetch, parse and clean metrics are returned for the parent to merge.
+    """
+    from zombies_data_collector import ZombiesDataCollector
+    # A spawned process starts with an empty, disabled registry
+    metrics.enabled = record_metrics
+    os.makedirs(state_dir_for(settings['data_dir']), exist_ok=True)
+    collector = ZombiesDataCollector(state_path=source_state_path(settings['data_dir'], source_name), **settings)
+    collector.sources[source_name] = source
+    start = time.perf_counter()
+    try:
+        if collector.resume:
+            collector.restore_collected_data()
+        collector.collect_source(source_name, data_types)
+        return {
+            "source": source_name,
+            "collected_data": collector.collected_data,
+            "seconds": time.perf_counter() - start,
+            "frontier": collector.frontier.summary(),
+            "cache": collector.fetcher.cache.stats() if collector.fetcher.cache else None,
+            "pages": collector.state.counts(),
+            "metrics": metrics.snapshot() if record_metrics else None
+        }
+    finally:
+        collector.fetcher.close()
+        collector.state.close()
+        collector.cleaner.close()
+
+
+def collect_parallel(collector, answers, processes=None):
+    """Collect each selected source in its own process, then merge them into `collector`.
+
+    Results are merged in the order the sources were selected, not the order they
+    finish in, so the same pages always give the same dataset. Returns the names
+    of the sources that failed; the others are still merged.
+    """
+    sources = list(answers['sources'])
+    processes = min(processes or len(sources), len(sources))
+    print(f"\nCollecting {len(sources)} sources in {processes} processes")
+    start = time.perf_counter()
+    results = {}
+    # Spawned rather than forked, so no worker inherits the parent's sqlite handles or session
+    executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = {executor.submit(collect_source_worker, source_name, collector.sources[source_name],
+                                   answers['data_types'], collector.worker_settings, metrics.enabled): source_name
+                   for source_name in sources}
+        for future in as_completed(futures):
+            source_name = futures[future]
+            try:
+                results[source_name] = future.result()
+            except Exception as e:
+                print(f"\n{source_name} failed: {e}")
+                continue
+            print(f"\nFinished {source_name} in {results[source_name]['seconds']:.1f}s")
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    elapsed = time.perf_counter() - start
+
+    print(f"\nSources:")
+    for source_name in sources:
+        result = results.get(source_name)
+        if result is None:
+            print(f"  {source_name:<20} failed")
+            continue
+        collector.merge_collected_data(result["collected_data"])
+        # Fold the worker's counters into this process, so the run totals cover every source
+        if result["metrics"]:
+            metrics.merge(result["metrics"])
+        # The merged metrics already hold the worker's frontier_links_total
+        for key, count in result["frontier"].items():
+            collector.frontier.stats[key] += count
+        if result["cache"] and collector.fetcher.cache:
+            collector.fetcher.cache.hits += result["cache"]["hits"]
+            collector.fetcher.cache.misses += result["cache"]["misses"]
+            collector.fetcher.cache.revalidated += result["cache"]["revalidated"]
+        metrics.set('collect_source_seconds', round(result["seconds"], 3), source=source_name)
+        records = {category: len(items) for category, items in result["collected_data"].items() if items}
+        print(f"  {source_name:<20} {result['seconds']:>7.1f}s  records {records}  pages {result['pages']}")
+    sequential = sum(result["seconds"] for result in results.values())
+    print(f"Collected in {elapsed:.1f}s; one after another the sources took {sequential:.1f}s")
+    return [source_name for source_name in sources if source_name not in results]
@@ -0,0 +1,286 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+
+PREFIX = 'zombies_'
+# Histogram bucket upper bounds, in seconds for timings
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add another histogram's observations; both must have the same buckets"""
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating linearly inside the bucket that holds it"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and histograms, keyed by name and labels.
+
+    Recording is a no-op until `enabled` is set (--profile does that), so the
+    instrumented code paths cost one attribute check in normal runs.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """Observe how long the block takes into histogram `name`"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of timer()"""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """The raw counters, gauges and histograms, picklable so a worker process can return them"""
+        import copy
+
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": copy.deepcopy(self.histograms)
+            }
+
+    def merge(self, snapshot):
+        """Fold a snapshot() from another process into this registry: counters and
+        histograms add up, gauges take the snapshot's value"""
+        with self.lock:
+            for key, value in snapshot["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(snapshot["gauges"])
+            for key, histogram in snapshot["histograms"].items():
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(histogram.buckets)
+                self.histograms[key].merge(histogram)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def to_prometheus(self):
+        """The metrics in Prometheus' text exposition format (for node_exporter's textfile collector)"""
+        lines = []
+        with self.lock:
+            for kind, series in [('counter', self.counters), ('gauge', self.gauges)]:
+                for name in sorted({name for name, _ in series}):
+                    lines.append(f'# TYPE {PREFIX}{name} {kind}')
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f'{PREFIX}{name}{format_labels(labels)} {value}')
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f'# TYPE {PREFIX}{name} histogram')
+                for (series_name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{PREFIX}{name}_bucket{format_labels(labels + (("le", str(bound)),))} '
+                                     f'{cumulative}')
+                    lines.append(f'{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{PREFIX}{name}_count{format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Counters, gauges and histogram count/sum/mean/p50/p95/p99 as a JSON-friendly dict"""
+        def series_name(name, labels):
+            return name + format_labels(labels)
+
+        with self.lock:
+            return {
+                "counters": {series_name(*key): value for key, value in sorted(self.counters.items())},
+                "gauges": {series_name(*key): value for key, value in sorted(self.gauges.items())},
+                "histograms": {series_name(*key): {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "mean": round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                    "min": round_or_none(histogram.min),
+                    "max": round_or_none(histogram.max),
+                    "p50": round_or_none(histogram.quantile(0.5)),
+                    "p95": round_or_none(histogram.quantile(0.95)),
+                    "p99": round_or_none(histogram.quantile(0.99))
+                } for key, histogram in sorted(self.histograms.items(), key=lambda item: item[0])}
+            }
+
+    def write(self, path):
+        """Write a .json summary, or the Prometheus text format for any other extension"""
+        import json
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                json.dump(self.summary(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def round_or_none(value, digits=6):
+    return None if value is None else round(value, digits)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for name, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+metrics = MetricsRegistry()
+
+
+class Profiler:
+    """What --profile does: records metrics and runs cProfile, in every thread started
+    inside the block, then writes `<name>-<timestamp>` .prom/.json/.prof files to `output_dir`
+    and prints the hottest functions.
+    """
+
+    def __init__(self, name, output_dir='profiles', top=25):
+        self.name = name
+        self.output_dir = output_dir
+        self.top = top
+        self.profiles = []
+        self.lock = threading.Lock()
+
+    def thread_profile(self, frame, event, arg):
+        # Installed with threading.setprofile, so it runs once in each new thread;
+        # enabling a profiler there replaces this hook
+        import cProfile
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def __enter__(self):
+        import cProfile
+        metrics.enabled = True
+        self.profile = cProfile.Profile()
+        threading.setprofile(self.thread_profile)
+        self.start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        import pstats
+
+        self.profile.disable()
+        threading.setprofile(None)
+        metrics.set('run_seconds', round(time.perf_counter() - self.start, 3))
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f'{self.name}-{time.strftime("%Y%m%d_%H%M%S")}')
+
+        stats = pstats.Stats(self.profile)
+        with self.lock:
+            for profile in self.profiles:
+                try:
+                    stats.add(profile)
+                except (TypeError, ValueError):
+                    # Threads still inside their first call have nothing to report yet
+                    continue
+        stats.dump_stats(f'{base}.prof')
+        metrics.write(f'{base}.prom')
+        metrics.write(f'{base}.json')
+
+        # Own time, not cumulative: with many threads, cumulative time is mostly waiting
+        print(f"\nHottest functions by own time ({len(self.profiles) + 1} threads profiled):")
+        stats.sort_stats('tottime').print_stats(self.top)
+        print(f"Profile written to {base}.prof (open with `python -m pstats` or snakeviz)")
+        print(f"Metrics written to {base}.prom and {base}.json")
+        return False
+
+
+def profiled(enabled, name, output_dir='profiles'):
+    """A Profiler when `enabled` (the --profile flag), otherwise a context that does nothing"""
+    return Profiler(name, output_dir) if enabled else contextlib.nullcontext()
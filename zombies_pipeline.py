@@ -0,0 +1,210 @@
+import queue
+import threading
+import time
+
+from zombies_metrics import metrics
+
+# Marks the end of a stage's input
+DONE = object()
+# How often blocked threads check whether the pipeline was stopped
+POLL_SECONDS = 0.1
+
+
+class StageStats:
+    """Counters for one stage; `busy` is time spent in the stage function, `blocked`
+    time spent waiting for room downstream (a slower later stage shows up here)"""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, items_in=0, items_out=0, errors=0, busy=0.0, blocked=0.0):
+        with self.lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.errors += errors
+            self.busy_seconds += busy
+            self.blocked_seconds += blocked
+
+    def as_dict(self, elapsed):
+        return {
+            "stage": self.name,
+            "in": self.items_in,
+            "out": self.items_out,
+            "errors": self.errors,
+            "items_per_second": round(self.items_in / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 2) if elapsed else 0.0,
+            "blocked_seconds": round(self.blocked_seconds, 2)
+        }
+
+
+class Stage:
+    """One pipeline step: `function(item)` returns an iterable of output items
+    (a generator, a list, or an empty tuple to drop the item).
+
+    With several workers, items are still passed on in input order; a finished
+    item waits for the ones before it, which also bounds how many are in flight.
+    """
+
+    def __init__(self, name, function, workers=1):
+        self.name = name
+        self.function = function
+        self.workers = workers
+
+
+class Pipeline:
+    """Runs a source generator through stages, each in its own threads, joined by bounded queues.
+
+    A full queue blocks the stage feeding it, so a slow stage throttles everything
+    upstream instead of letting items pile up: at most about `queue_size` items
+    per queue (plus one per worker) are held at any time. Errors raised by a
+    stage function are counted and the item is dropped; errors in the source
+    end the run and are raised from run().
+    """
+
+    def __init__(self, source, stages, queue_size=16, report_every=None):
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        # Seconds between progress reports printed while running; None only reports at the end
+        self.report_every = report_every
+        self.stats = [StageStats('source')] + [StageStats(stage.name, stage.workers) for stage in stages]
+        self.stop_event = threading.Event()
+        self.source_error = None
+        self.start_time = None
+        self.end_time = None
+
+    def elapsed(self):
+        if not self.start_time:
+            return 0.0
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def put(self, q, item, stats):
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        stats.add(blocked=time.perf_counter() - start)
+
+    def get(self, q):
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return DONE
+
+    def feed(self, output, stats):
+        try:
+            for seq, item in enumerate(self.source):
+                if self.stop_event.is_set():
+                    return
+                stats.add(items_in=1, items_out=1)
+                self.put(output, (seq, item), stats)
+        except Exception as e:
+            self.source_error = e
+        finally:
+            self.put(output, DONE, stats)
+
+    def work(self, stage, stats, inbox, outbox, turn, finished):
+        while True:
+            entry = self.get(inbox)
+            if entry is DONE:
+                # Let sibling workers see the end too; the last one to finish passes it on
+                self.put(inbox, DONE, stats)
+                with turn:
+                    finished[0] += 1
+                    last = finished[0] == stage.workers
+                if last:
+                    self.put(outbox, DONE, stats)
+                return
+
+            seq, item = entry
+            start = time.perf_counter()
+            try:
+                results, errors = list(stage.function(item)), 0
+            except Exception as e:
+                print(f"{stage.name} failed: {e}")
+                results, errors = [], 1
+            stats.add(items_in=1, errors=errors, busy=time.perf_counter() - start)
+
+            with turn:
+                while turn.next_seq != seq and not self.stop_event.is_set():
+                    turn.wait(POLL_SECONDS)
+            for result in results:
+                with turn:
+                    out_seq = turn.out_seq
+                    turn.out_seq += 1
+                self.put(outbox, (out_seq, result), stats)
+            stats.add(items_out=len(results))
+            with turn:
+                turn.next_seq += 1
+                turn.notify_all()
+
+    def run(self):
+        """Yield the last stage's outputs as they are produced"""
+        self.start_time = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self.feed, args=(queues[0], self.stats[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            turn = threading.Condition()
+            turn.next_seq, turn.out_seq = 0, 0
+            finished = [0]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self.work, daemon=True,
+                    args=(stage, self.stats[i + 1], queues[i], queues[i + 1], turn, finished)))
+        for thread in threads:
+            thread.start()
+
+        last_report = time.perf_counter()
+        try:
+            while True:
+                try:
+                    entry = queues[-1].get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    entry = None
+                if self.report_every and time.perf_counter() - last_report >= self.report_every:
+                    print(self.format_stats())
+                    last_report = time.perf_counter()
+                if entry is DONE:
+                    break
+                if entry is not None:
+                    yield entry[1]
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+            self.end_time = time.perf_counter()
+            self.record_metrics()
+        if self.source_error:
+            raise self.source_error
+
+    def record_metrics(self):
+        for stats in self.stats:
+            metrics.inc('pipeline_items_total', stats.items_in, stage=stats.name, direction='in')
+            metrics.inc('pipeline_items_total', stats.items_out, stage=stats.name, direction='out')
+            metrics.inc('pipeline_errors_total', stats.errors, stage=stats.name)
+            metrics.inc('pipeline_busy_seconds_total', stats.busy_seconds, stage=stats.name)
+            metrics.inc('pipeline_blocked_seconds_total', stats.blocked_seconds, stage=stats.name)
+
+    def stats_dicts(self):
+        elapsed = self.elapsed()
+        return [stats.as_dict(elapsed) for stats in self.stats]
+
+    def format_stats(self):
+        lines = [f"Pipeline after {self.elapsed():.1f}s:"]
+        for row in self.stats_dicts():
+            lines.append(f"  {row['stage']:<10} in {row['in']:>7} out {row['out']:>7} "
+                         f"errors {row['errors']:>4} {row['items_per_second']:>8.2f}/s "
+                         f"busy {row['utilization']:>4.0%} blocked {row['blocked_seconds']:>7.2f}s")
+        return '\n'.join(lines)
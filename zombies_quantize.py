@@ -0,0 +1,217 @@
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+QUANTIZED_WEIGHTS = 'quantized_model.pt'
+QUANTIZATION_CONFIG = 'quantization.json'
+REPORT_PROMPTS = [
+    "What is the best strategy for Origins?",
+    "How do I build the Ice Staff?",
+    "What perks should I buy first?",
+]
+
+
+def conv1d_to_linear(model):
+    """Swap GPT-2's Conv1D layers for equivalent nn.Linear ones, which dynamic quantization understands"""
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for child_name, child in list(parent.named_children()):
+            if not isinstance(child, Conv1D):
+                continue
+            # Conv1D computes x @ W + b with W stored as (in, out); Linear stores (out, in)
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(parent, child_name, linear)
+    return model
+
+
+def quantize_model(model):
+    """Dynamic int8 quantization of every Linear (attention, MLP and LM head) layer"""
+    import torch
+
+    model = conv1d_to_linear(model)
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def library_versions():
+    import torch
+    import transformers
+    return {"torch": torch.__version__, "transformers": transformers.__version__}
+
+
+def export_quantized(model_dir, output_dir):
+    """Write an int8 copy of the checkpoint in `model_dir` to `output_dir`"""
+    import torch
+    from transformers import GPT2LMHeadModel, GPT2Tokenizer
+
+    print(f"Quantizing {model_dir} to int8...")
+    model = quantize_model(GPT2LMHeadModel.from_pretrained(model_dir))
+    os.makedirs(output_dir, exist_ok=True)
+    # The whole module is saved, not just its state_dict: rebuilding the layout for a
+    # state_dict means materializing the fp32 model first, which keeps its memory resident
+    torch.save(model, os.path.join(output_dir, QUANTIZED_WEIGHTS))
+    model.config.save_pretrained(output_dir)
+    GPT2Tokenizer.from_pretrained(model_dir).save_pretrained(output_dir)
+    with open(os.path.join(output_dir, QUANTIZATION_CONFIG), 'w', encoding='utf-8') as f:
+        json.dump({"method": "dynamic", "dtype": "qint8", "source": os.path.abspath(model_dir),
+                   **library_versions()}, f, indent=2)
+    print(f"Quantized model saved to {output_dir}")
+
+
+def load_quantized(model_dir):
+    """Load a checkpoint written by export_quantized (it is a pickle, so only load your own)"""
+    import torch
+
+    config_path = os.path.join(model_dir, QUANTIZATION_CONFIG)
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"{model_dir} has no {QUANTIZATION_CONFIG}; run zombies_quantize.py export first")
+    with open(config_path, 'r', encoding='utf-8') as f:
+        exported_with = json.load(f)
+    current = library_versions()
+    if any(exported_with.get(name) != version for name, version in current.items()):
+        print(f"Warning: {model_dir} was exported with torch {exported_with.get('torch')} / "
+              f"transformers {exported_with.get('transformers')}; re-export it if loading fails")
+    model = torch.load(os.path.join(model_dir, QUANTIZED_WEIGHTS))
+    model.eval()
+    return model
+
+
+def resident_memory_mb():
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(model_dir, quantized, data_path, max_new_tokens=50, max_eval_examples=200):
+    """Latency, memory and held-out perplexity of one model, measured in the current process"""
+    import torch
+    from transformers import GPT2LMHeadModel, GPT2Tokenizer
+    from train_zombies_model import format_example, split_examples
+    from zombies_dataset import load_training_examples
+
+    torch.manual_seed(0)
+    baseline_mb = resident_memory_mb()
+    start = time.perf_counter()
+    tokenizer = GPT2Tokenizer.from_pretrained(model_dir)
+    model = load_quantized(model_dir) if quantized else GPT2LMHeadModel.from_pretrained(model_dir)
+    model.eval()
+    load_seconds = time.perf_counter() - start
+    model_mb = resident_memory_mb() - baseline_mb
+
+    generated_tokens = 0
+    start = time.perf_counter()
+    with torch.no_grad():
+        for prompt in REPORT_PROMPTS:
+            inputs = tokenizer.encode(prompt + tokenizer.sep_token, return_tensors='pt')
+            # Fixed-length greedy decoding, so both models do the same amount of work
+            outputs = model.generate(inputs, max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens,
+                                     do_sample=False, eos_token_id=tokenizer.eos_token_id,
+                                     pad_token_id=tokenizer.eos_token_id)
+            generated_tokens += outputs.shape[1] - inputs.shape[1]
+    generate_seconds = time.perf_counter() - start
+
+    perplexity = None
+    try:
+        _, held_out = split_examples(load_training_examples(data_path))
+    except FileNotFoundError:
+        # Without an explicit dataset, perplexity is just skipped when none has been collected
+        if data_path:
+            raise
+        held_out = []
+    if held_out:
+        total_loss, total_tokens = 0.0, 0
+        with torch.no_grad():
+            for example in held_out[:max_eval_examples]:
+                ids = tokenizer.encode(format_example(example, tokenizer), return_tensors='pt')
+                ids = ids[:, :model.config.n_positions]
+                if ids.shape[1] < 2:
+                    continue
+                loss = model(ids, labels=ids).loss.item()
+                total_loss += loss * (ids.shape[1] - 1)
+                total_tokens += ids.shape[1] - 1
+        if total_tokens:
+            perplexity = math.exp(total_loss / total_tokens)
+
+    return {
+        "model_dir": model_dir,
+        "quantized": quantized,
+        "load_seconds": round(load_seconds, 2),
+        "resident_mb": round(model_mb, 1),
+        "ms_per_token": round(generate_seconds / max(generated_tokens, 1) * 1000, 2),
+        "tokens_per_second": round(generated_tokens / generate_seconds, 1),
+        "perplexity": round(perplexity, 3) if perplexity is not None else None
+    }
+
+
+def compare(fp32_dir, int8_dir, data_path, max_new_tokens=50, max_eval_examples=200, report_path=None):
+    """Measure both models in fresh processes, so resident memory isn't shared between them"""
+    results = []
+    for model_dir, quantized in [(fp32_dir, False), (int8_dir, True)]:
+        command = [sys.executable, os.path.abspath(__file__), 'measure', model_dir,
+                   '--max-new-tokens', str(max_new_tokens), '--max-eval-examples', str(max_eval_examples)]
+        if quantized:
+            command.append('--quantized')
+        if data_path:
+            command += ['--data', data_path]
+        output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n{'':<20}{'fp32':>12}{'int8':>12}")
+    for key in ['load_seconds', 'resident_mb', 'ms_per_token', 'tokens_per_second', 'perplexity']:
+        print(f"{key:<20}{str(results[0][key]):>12}{str(results[1][key]):>12}")
+
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({"fp32": results[0], "int8": results[1]}, f, indent=2)
+        print(f"\nReport saved to {report_path}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Int8 quantization for the Zombies model")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="Write an int8 copy of a checkpoint")
+    export.add_argument('--model-dir', default='./zombies_model_final')
+    export.add_argument('--output-dir', default='./zombies_model_int8')
+
+    report = commands.add_parser('compare', help="Compare fp32 and int8 latency, memory and perplexity")
+    report.add_argument('--model-dir', default='./zombies_model_final')
+    report.add_argument('--quantized-dir', default='./zombies_model_int8')
+    report.add_argument('--data', help="Dataset whose held-out split is used for perplexity "
+                                       "(default: latest collected dataset)")
+    report.add_argument('--max-new-tokens', type=int, default=50)
+    report.add_argument('--max-eval-examples', type=int, default=200)
+    report.add_argument('--report', default='quantization_report.json')
+
+    single = commands.add_parser('measure', help="Measure one model (used by compare)")
+    single.add_argument('model_dir')
+    single.add_argument('--quantized', action='store_true')
+    single.add_argument('--data')
+    single.add_argument('--max-new-tokens', type=int, default=50)
+    single.add_argument('--max-eval-examples', type=int, default=200)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == 'export':
+        export_quantized(args.model_dir, args.output_dir)
+    elif args.command == 'compare':
+        compare(args.model_dir, args.quantized_dir, args.data, args.max_new_tokens,
+                args.max_eval_examples, args.report)
+    else:
+        print(json.dumps(measure(args.model_dir, args.quantized, args.data,
+                                 args.max_new_tokens, args.max_eval_examples)))
@@ -0,0 +1,184 @@
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+REDDIT_URL = 'https://www.reddit.com'
+# Reddit's listing endpoints return at most 100 items per page
+PAGE_SIZE = 100
+
+
+class BrowserPool:
+    """Long-lived headless Chrome drivers, started on first use and shared between threads"""
+
+    def __init__(self, size=2, page_timeout=30):
+        self.size = size
+        self.page_timeout = page_timeout
+        self.idle = queue.Queue()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle.empty() and len(self.drivers) < self.size:
+                import selenium.webdriver as webdriver
+                from selenium.webdriver.chrome.options import Options
+
+                chrome_options = Options()
+                chrome_options.add_argument("--headless")
+                driver = webdriver.Chrome(options=chrome_options)
+                driver.set_page_load_timeout(self.page_timeout)
+                self.drivers.append(driver)
+                return driver
+        return self.idle.get()
+
+    def get_text(self, url):
+        """The page's visible text; Chrome shows JSON responses as plain text"""
+        from selenium.webdriver.common.by import By
+
+        driver = self.acquire()
+        try:
+            driver.get(url)
+            return driver.find_element(By.TAG_NAME, 'body').text
+        finally:
+            self.idle.put(driver)
+
+    def close(self):
+        with self.lock:
+            for driver in self.drivers:
+                driver.quit()
+            self.drivers = []
+
+
+class RedditClient:
+    """Collects posts and comments from Reddit's JSON search and comment endpoints.
+
+    Requests go through the shared ZombiesFetcher, so they get its per-host rate
+    limit and HTTP cache. Each search follows the `after` cursor for up to
+    `max_pages` pages; searches run in parallel and comment threads are fetched
+    once per unique post. When a JSON request fails (Reddit serves blocked
+    clients an HTML page), the same URL is loaded in a pooled headless browser,
+    and the rest of the run keeps using the browser.
+    """
+
+    def __init__(self, fetcher, base_url=REDDIT_URL, max_pages=10, browser_pool_size=2):
+        self.fetcher = fetcher
+        self.base_url = base_url.rstrip('/')
+        self.max_pages = max_pages
+        self.browser = BrowserPool(browser_pool_size) if browser_pool_size else None
+        self.use_browser = False
+        self.stats = {"requests": 0, "browser_requests": 0, "failed": 0,
+                      "posts": 0, "duplicate_posts": 0, "comments": 0, "duplicate_comments": 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def search_url(self, subreddit, term, after=None):
+        params = {'q': term, 'restrict_sr': 1, 'sort': 'new', 'limit': PAGE_SIZE, 'raw_json': 1}
+        if after:
+            params['after'] = after
+        return f"{self.base_url}/r/{subreddit}/search.json?{urlencode(params)}"
+
+    def comments_url(self, permalink):
+        return f"{self.base_url}{permalink.rstrip('/')}.json?{urlencode({'limit': 500, 'raw_json': 1})}"
+
+    def fetch_json(self, url):
+        if not self.use_browser:
+            self.count("requests")
+            result = self.fetcher.fetch(url)
+            try:
+                if result:
+                    return json.loads(result.text)
+            except ValueError:
+                print(f"Expected JSON from {url}, got something else")
+        if self.browser is None:
+            self.count("failed")
+            return None
+        try:
+            self.count("browser_requests")
+            data = json.loads(self.browser.get_text(url))
+        except Exception as e:
+            print(f"Browser fallback failed for {url}: {str(e)}")
+            self.count("failed")
+            return None
+        with self.stats_lock:
+            switched, self.use_browser = not self.use_browser, True
+        if switched:
+            print("Reddit JSON requests are failing; using the browser pool for the rest of the run")
+        return data
+
+    def search(self, subreddit, term):
+        """Every post the search returns, following the pagination cursor"""
+        posts, after = [], None
+        for _ in range(self.max_pages):
+            listing = self.fetch_json(self.search_url(subreddit, term, after))
+            if not listing:
+                break
+            data = listing.get('data', {})
+            for child in data.get('children', []):
+                if child.get('kind') == 't3':
+                    post = child['data']
+                    posts.append({"id": post['name'], "subreddit": subreddit,
+                                  "title": post.get('title', ''), "selftext": post.get('selftext', ''),
+                                  "permalink": post.get('permalink', ''),
+                                  "num_comments": post.get('num_comments', 0)})
+            after = data.get('after')
+            if not after:
+                break
+        return posts
+
+    def comments(self, post):
+        """The comments of one post, flattened from the reply tree"""
+        thread = self.fetch_json(self.comments_url(post["permalink"]))
+        if not isinstance(thread, list) or len(thread) < 2:
+            return []
+        comments = []
+        stack = list(reversed(thread[1].get('data', {}).get('children', [])))
+        while stack:
+            child = stack.pop()
+            # "more" stubs stand for replies that need another API call; they are skipped
+            if child.get('kind') != 't1':
+                continue
+            comment = child['data']
+            comments.append({"id": comment['name'], "post_id": post["id"], "body": comment.get('body', '')})
+            replies = comment.get('replies')
+            if isinstance(replies, dict):
+                stack.extend(reversed(replies.get('data', {}).get('children', [])))
+        return comments
+
+    def collect(self, subreddits, search_terms, with_comments=True):
+        """(posts, comments) for every subreddit x search term, each deduplicated by ID"""
+        queries = [(subreddit, term) for subreddit in subreddits for term in search_terms]
+        # Each search walks its pages in order, but searches and comment threads run side by side
+        with ThreadPoolExecutor(max_workers=self.fetcher.max_workers) as executor:
+            results = list(executor.map(lambda query: self.search(*query), queries))
+
+            # The same post turns up under several search terms; its thread is only fetched once
+            posts, seen = [], set()
+            for post in (post for result in results for post in result):
+                if post["id"] in seen:
+                    self.count("duplicate_posts")
+                    continue
+                seen.add(post["id"])
+                posts.append(post)
+            self.count("posts", len(posts))
+
+            comments = []
+            if with_comments:
+                threads = executor.map(self.comments, [post for post in posts if post["num_comments"]])
+                seen = set()
+                for comment in (comment for thread in threads for comment in thread):
+                    if comment["id"] in seen:
+                        self.count("duplicate_comments")
+                        continue
+                    seen.add(comment["id"])
+                    comments.append(comment)
+                self.count("comments", len(comments))
+        return posts, comments
+
+    def close(self):
+        if self.browser:
+            self.browser.close()
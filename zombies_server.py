@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class BatchRequest:
+    def __init__(self, prompt, max_new_tokens, future):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class DynamicBatcher:
+    """Queues concurrent prompts and answers them in batches of up to `max_batch_size`.
+
+    A batch is closed once it is full or `max_wait_ms` after its first request
+    arrived. Batches run one at a time on a single worker thread, so the event
+    loop keeps accepting requests while the model is busy.
+    """
+
+    def __init__(self, bot, max_batch_size=8, max_wait_ms=20, max_concurrent=64, timeout=60):
+        self.bot = bot
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.queue = asyncio.Queue()
+        self.in_flight = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stats = {"requests": 0, "batches": 0, "rejected": 0, "timed_out": 0}
+
+    async def submit(self, prompt, max_new_tokens):
+        """Wait for the reply to `prompt`; raises ServerBusy or asyncio.TimeoutError"""
+        if self.in_flight >= self.max_concurrent:
+            self.stats["rejected"] += 1
+            raise ServerBusy()
+        self.in_flight += 1
+        self.stats["requests"] += 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await self.queue.put(BatchRequest(prompt, max_new_tokens, future))
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Requests that timed out while queued have nobody waiting for them
+        return [request for request in batch if not request.future.done()]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            if not batch:
+                continue
+            prompts = [request.prompt for request in batch]
+            max_new_tokens = max(request.max_new_tokens for request in batch)
+            self.stats["batches"] += 1
+            try:
+                responses = await loop.run_in_executor(self.executor, self.bot.generate_batch,
+                                                       prompts, max_new_tokens)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            for request, response in zip(batch, responses):
+                if not request.future.done():
+                    request.future.set_result(response)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ZombiesServer:
+    """Minimal HTTP/1.1 front end: POST /generate {"prompt": ...}, GET /health"""
+
+    def __init__(self, batcher, default_max_new_tokens=200):
+        self.batcher = batcher
+        self.default_max_new_tokens = default_max_new_tokens
+
+    async def handle(self, reader, writer):
+        try:
+            status, payload = await self.dispatch(reader)
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode('latin-1') + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def parse_generate(self, request):
+        """The prompt and max_new_tokens of a /generate body; raises ValueError for a bad one.
+
+        A batch generates as many tokens as its largest request asks for, so one
+        client's max_new_tokens is capped at the server's --max-new-tokens.
+        """
+        if not isinstance(request, dict):
+            raise ValueError("Expected a JSON object")
+        prompt = request.get("prompt")
+        if not isinstance(prompt, str):
+            raise ValueError("\"prompt\" must be a string")
+        prompt = prompt.strip()
+        if not prompt:
+            raise ValueError("Empty prompt")
+        max_new_tokens = request.get("max_new_tokens", self.default_max_new_tokens)
+        # bool is an int subclass, but true/false isn't a token count
+        if not isinstance(max_new_tokens, int) or isinstance(max_new_tokens, bool):
+            raise ValueError("\"max_new_tokens\" must be an integer")
+        if not 1 <= max_new_tokens <= self.default_max_new_tokens:
+            raise ValueError(f"\"max_new_tokens\" must be between 1 and {self.default_max_new_tokens}")
+        return prompt, max_new_tokens
+
+    async def dispatch(self, reader):
+        request_line = (await reader.readuntil(b'\r\n')).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise ValueError("Malformed request line")
+        method, path = request_line[0], request_line[1]
+        headers = {}
+        while True:
+            line = (await reader.readuntil(b'\r\n')).decode('latin-1').strip()
+            if not line:
+                break
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {"status": "ok", "queued": self.batcher.queue.qsize(),
+                                   **self.batcher.stats}
+        if path != '/generate':
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown path {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST"}
+
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+        prompt, max_new_tokens = self.parse_generate(json.loads(await reader.readexactly(length)))
+        start = time.perf_counter()
+        try:
+            response = await self.batcher.submit(prompt, max_new_tokens)
+        except ServerBusy:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Too many concurrent requests"}
+        except asyncio.TimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, {"error": "Request timed out"}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        return HTTPStatus.OK, {"response": response,
+                               "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+async def serve(args):
+    from zombies_chat import ZombiesBot
+    import torch
+
+    if args.torch_threads:
+        torch.set_num_threads(args.torch_threads)
+    bot = ZombiesBot(model_dir=args.model_dir, knowledge_base_path=args.knowledge_base,
+                     rag_passages=args.rag_passages, quantized=args.quantized)
+    # Requests are capped at --max-new-tokens, so checking it covers every request
+    try:
+        bot.check_max_new_tokens(args.max_new_tokens)
+    except ValueError as e:
+        raise SystemExit(f"--max-new-tokens: {e}")
+    batcher = DynamicBatcher(bot, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                             max_concurrent=args.max_concurrent, timeout=args.timeout)
+    server = ZombiesServer(batcher, default_max_new_tokens=args.max_new_tokens)
+    batch_loop = asyncio.create_task(batcher.run())
+    http = await asyncio.start_server(server.handle, args.host, args.port)
+    print(f"Zombies Bot serving on http://{args.host}:{args.port} "
+          f"(batch size {args.max_batch_size}, wait {args.max_wait_ms} ms)")
+    try:
+        async with http:
+            await http.serve_forever()
+    finally:
+        batch_loop.cancel()
+        batcher.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the Zombies Bot over HTTP with dynamic batching")
+    parser.add_argument('--model-dir', default='./zombies_model_final')
+    parser.add_argument('--knowledge-base', default=None,
+                        help="Dataset directory or legacy structured JSON (default: latest collected dataset)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=20,
+                        help="How long the first request of a batch waits for others to join")
+    parser.add_argument('--max-concurrent', type=int, default=64,
+                        help="Requests queued or running at once; more get 503")
+    parser.add_argument('--timeout', type=float, default=60,
+                        help="Seconds before a request gets 504")
+    parser.add_argument('--max-new-tokens', type=int, default=200,
+                        help="Default and largest max_new_tokens a request may ask for")
+    parser.add_argument('--rag-passages', type=int, default=0)
+    parser.add_argument('--quantized', action='store_true',
+                        help="--model-dir holds an int8 checkpoint from zombies_quantize.py")
+    parser.add_argument('--torch-threads', type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
@@ -0,0 +1,133 @@
+import torch
+
+
+def cache_length(past_key_values):
+    return 0 if past_key_values is None else past_key_values[0][0].shape[2]
+
+
+def crop_cache(past_key_values, length):
+    """Keep the cached keys/values of the first `length` tokens"""
+    if past_key_values is None or cache_length(past_key_values) <= length:
+        return past_key_values
+    return tuple((key[:, :, :length], value[:, :, :length]) for key, value in past_key_values)
+
+
+class DecodeState:
+    """Tokens so far and each model's KV cache; a cache may cover only a prefix of `tokens`"""
+
+    def __init__(self, tokens, target_past=None, draft_past=None):
+        self.tokens = list(tokens)
+        self.target_past = target_past
+        self.draft_past = draft_past
+
+
+class SpeculativeDecoder:
+    """Speculative sampling: the draft model proposes a few tokens, the target model checks them in one pass.
+
+    Each proposed token is accepted with probability min(1, p/q), where p and q
+    are the target's and draft's probabilities after the same logits processors.
+    The first rejected token is resampled from max(0, p - q), so the output has
+    the target model's sampling distribution however good the draft is; a better
+    draft only means more tokens per target forward pass.
+    """
+
+    def __init__(self, target, draft, num_draft_tokens=4):
+        if target.config.vocab_size != draft.config.vocab_size:
+            raise ValueError(f"Draft vocabulary ({draft.config.vocab_size}) doesn't match "
+                             f"the model's ({target.config.vocab_size})")
+        self.target = target
+        self.draft = draft
+        self.num_draft_tokens = num_draft_tokens
+        self.stats = {"drafted": 0, "accepted": 0, "target_passes": 0, "generated": 0}
+
+    def acceptance_rate(self):
+        return self.stats["accepted"] / self.stats["drafted"] if self.stats["drafted"] else 0.0
+
+    def tokens_per_pass(self):
+        return self.stats["generated"] / self.stats["target_passes"] if self.stats["target_passes"] else 0.0
+
+    def probabilities(self, logits, context, processors, warpers):
+        context = torch.tensor([context])
+        return torch.softmax(warpers(context, processors(context, logits)), dim=-1)[0]
+
+    def sample(self, state, max_new_tokens, processors, warpers, stop_ids, context_start=0):
+        """Yield lists of new tokens, appending them to `state.tokens` and updating its caches.
+
+        `context_start` is where the logits processors' view of the context begins,
+        and generation ends before any token in `stop_ids`.
+        """
+        generated = 0
+        with torch.no_grad():
+            while generated < max_new_tokens:
+                start_length = len(state.tokens)
+                draft_tokens, draft_probs = self.propose(state, min(self.num_draft_tokens, max_new_tokens - generated),
+                                                         processors, warpers, stop_ids, context_start)
+
+                # One target pass scores every proposed position, plus the one after them
+                sequence = state.tokens + draft_tokens
+                fed = cache_length(state.target_past)
+                outputs = self.target(input_ids=torch.tensor([sequence[fed:]]),
+                                      past_key_values=state.target_past, use_cache=True)
+                state.target_past = outputs.past_key_values
+                logits = outputs.logits[0]
+
+                new_tokens = []
+                accepted = 0
+                for i, token in enumerate(draft_tokens):
+                    position = start_length + i
+                    p = self.probabilities(logits[position - 1 - fed][None], sequence[context_start:position],
+                                           processors, warpers)
+                    q = draft_probs[i]
+                    if torch.rand(()) * q[token] < p[token]:
+                        new_tokens.append(token)
+                        accepted += 1
+                        if token in stop_ids:
+                            break
+                        continue
+                    residual = torch.clamp(p - q, min=0)
+                    residual = residual / residual.sum() if residual.sum() > 0 else p
+                    new_tokens.append(torch.multinomial(residual, num_samples=1).item())
+                    break
+                else:
+                    # Every proposal was accepted, so the target's next prediction comes for free
+                    p = self.probabilities(logits[len(sequence) - 1 - fed][None], sequence[context_start:],
+                                           processors, warpers)
+                    new_tokens.append(torch.multinomial(p, num_samples=1).item())
+
+                self.stats["drafted"] += len(draft_tokens)
+                self.stats["accepted"] += accepted
+                self.stats["target_passes"] += 1
+
+                new_tokens = new_tokens[:max_new_tokens - generated]
+                stop = next((i for i, token in enumerate(new_tokens) if token in stop_ids), None)
+                if stop is not None:
+                    new_tokens = new_tokens[:stop]
+                state.tokens.extend(new_tokens)
+                generated += len(new_tokens)
+                self.stats["generated"] += len(new_tokens)
+
+                # Drop cache entries for rejected proposals; the newest token stays unfed
+                valid = min(start_length + accepted, len(state.tokens) - 1)
+                state.target_past = crop_cache(state.target_past, valid)
+                state.draft_past = crop_cache(state.draft_past, valid)
+
+                if new_tokens:
+                    yield new_tokens
+                if stop is not None:
+                    return
+
+    def propose(self, state, count, processors, warpers, stop_ids, context_start):
+        tokens, probs = [], []
+        for _ in range(count):
+            sequence = state.tokens + tokens
+            fed = cache_length(state.draft_past)
+            outputs = self.draft(input_ids=torch.tensor([sequence[fed:]]),
+                                 past_key_values=state.draft_past, use_cache=True)
+            state.draft_past = outputs.past_key_values
+            q = self.probabilities(outputs.logits[:, -1, :], sequence[context_start:], processors, warpers)
+            token = torch.multinomial(q, num_samples=1).item()
+            tokens.append(token)
+            probs.append(q)
+            if token in stop_ids:
+                break
+        return tokens, probs